@@ -0,0 +1,235 @@
+"""
+Benchmark suite for QueueAutomator and MultiprocessMaybe.
+
+Every scenario runs in its own interpreter so the peak RSS of one does not leak into the next.
+
+    python benchmarks/suite.py                              # run everything and print a table
+    python benchmarks/suite.py --save baseline.json         # keep the numbers as a baseline
+    python benchmarks/suite.py --compare baseline.json      # fail when a scenario regressed
+    python benchmarks/suite.py --scenario tiny_items --transport shm_ring --scale 0.1
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+from os import cpu_count
+from statistics import quantiles
+from time import monotonic, perf_counter
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+from queue_automator import QueueAutomator
+from queue_automator.maybe import MultiprocessMaybe
+
+TRANSPORTS = ('manager', 'pipe', 'shm_ring')
+DEFAULT_TOLERANCE = 0.2
+
+
+# Items travel as (enqueue timestamp, value) so the consumer can measure the end to end latency,
+# time.monotonic() is a system wide clock on Linux and comparable across processes
+def timestamped(values: Iterator[Any]) -> Iterator[Tuple[float, Any]]:
+    for value in values:
+        yield monotonic(), value
+
+
+def add_one(item: Tuple[float, int]) -> Tuple[float, int]:
+    return item[0], item[1] + 1
+
+
+def add_one_all(items: List[Tuple[float, int]]) -> List[Tuple[float, int]]:
+    return [(timestamp, value + 1) for timestamp, value in items]
+
+
+def burn_cpu(item: Tuple[float, int]) -> Tuple[float, int]:
+    total = 0
+    for value in range(400_000):
+        total += value * value
+    return item[0], total % (item[1] + 1)
+
+
+def checksum(item: Tuple[float, bytes]) -> Tuple[float, bytes]:
+    return item[0], item[1][::-1]
+
+
+def build_chain(transport: str, functions: List[Callable], process_count: int, **options: Any) -> QueueAutomator:
+    automator = QueueAutomator(transport=transport)
+    for index, function in enumerate(functions):
+        input_name = 'input' if index == 0 else f'stage_{index}'
+        output_name = 'output' if index == len(functions) - 1 else f'stage_{index + 1}'
+        automator.register_as_worker_function(input_name, output_name, process_count, **options)(function)
+    return automator
+
+
+def scenario_tiny_items(transport: str, scale: float) -> Tuple[QueueAutomator, Iterator[Any], int]:
+    items = int(50_000 * scale)
+    return build_chain(transport, [add_one, add_one], 2), timestamped(iter(range(items))), items
+
+
+def scenario_tiny_items_batched(transport: str, scale: float) -> Tuple[QueueAutomator, Iterator[Any], int]:
+    items = int(50_000 * scale)
+    automator = build_chain(transport, [add_one_all, add_one_all], 2, batch_size=256, vectorized=True)
+    return automator, timestamped(iter(range(items))), items
+
+
+def scenario_heavy_items(transport: str, scale: float) -> Tuple[QueueAutomator, Iterator[Any], int]:
+    items = max(int(32 * scale), 4)
+    return build_chain(transport, [burn_cpu], cpu_count() or 1), timestamped(iter(range(items))), items
+
+
+def scenario_large_payloads(transport: str, scale: float) -> Tuple[QueueAutomator, Iterator[Any], int]:
+    items = max(int(200 * scale), 10)
+    payload = bytes(range(256)) * 4096  # 1 MiB
+    return build_chain(transport, [checksum, checksum], 2), timestamped(payload for _ in range(items)), items
+
+
+def scenario_deep_pipeline(transport: str, scale: float) -> Tuple[QueueAutomator, Iterator[Any], int]:
+    items = int(5_000 * scale)
+    return build_chain(transport, [add_one] * 10, 1), timestamped(iter(range(items))), items
+
+
+def scenario_wide_stage(transport: str, scale: float) -> Tuple[QueueAutomator, Iterator[Any], int]:
+    items = int(20_000 * scale)
+    return build_chain(transport, [add_one], cpu_count() or 1), timestamped(iter(range(items))), items
+
+
+SCENARIOS: Dict[str, Callable[[str, float], Tuple[QueueAutomator, Iterator[Any], int]]] = {
+    'tiny_items': scenario_tiny_items,
+    'tiny_items_batched': scenario_tiny_items_batched,
+    'heavy_items': scenario_heavy_items,
+    'large_payloads': scenario_large_payloads,
+    'deep_pipeline': scenario_deep_pipeline,
+    'wide_stage': scenario_wide_stage,
+}
+
+
+def latency_report(latencies: List[float]) -> Dict[str, float]:
+    if len(latencies) < 2:
+        return {'p50_latency': latencies[0] if latencies else 0.0, 'p99_latency': latencies[0] if latencies else 0.0}
+    percentiles = quantiles(latencies, n=100)
+    return {'p50_latency': percentiles[49], 'p99_latency': percentiles[98]}
+
+
+def peak_rss_mb() -> Dict[str, float]:
+    # ru_maxrss is in KiB on Linux, the children value is the largest worker that already exited
+    return {
+        'driver_peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'worker_peak_rss_mb': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+    }
+
+
+def run_automator_scenario(name: str, transport: str, scale: float) -> Dict[str, float]:
+    automator, data, items = SCENARIOS[name](transport, scale)
+
+    started = perf_counter()
+    automator.start()
+    startup = perf_counter() - started
+
+    latencies = []
+    started = perf_counter()
+    for timestamp, _ in automator.submit(data):
+        latencies.append(monotonic() - timestamp)
+    elapsed = perf_counter() - started
+
+    started = perf_counter()
+    automator.shutdown()
+    teardown = perf_counter() - started
+
+    assert len(latencies) == items, f'{name} returned {len(latencies)} results instead of {items}'
+    return {
+        'items': items,
+        'items_per_sec': items / elapsed,
+        'startup': startup,
+        'teardown': teardown,
+        **latency_report(latencies),
+        **peak_rss_mb(),
+    }
+
+
+def run_maybe_scenario(transport: str, scale: float) -> Dict[str, float]:
+    items = int(10_000 * scale)
+    maybe = MultiprocessMaybe()
+    maybe.automator.transport = transport
+
+    latencies = []
+    started = perf_counter()
+    stream = maybe.insert(timestamped(iter(range(items)))).then(add_one, 2).then(add_one, 2).stream(add_one, process_count=2)
+    for timestamp, _ in stream:
+        latencies.append(monotonic() - timestamp)
+    elapsed = perf_counter() - started
+
+    assert len(latencies) == items, f'maybe_chain returned {len(latencies)} results instead of {items}'
+    return {'items': items, 'items_per_sec': items / elapsed, **latency_report(latencies), **peak_rss_mb()}
+
+
+def run_one(name: str, transport: str, scale: float) -> Dict[str, float]:
+    if name == 'maybe_chain':
+        return run_maybe_scenario(transport, scale)
+    return run_automator_scenario(name, transport, scale)
+
+
+def run_isolated(name: str, transport: str, scale: float) -> Dict[str, float]:
+    output = subprocess.run(
+        [sys.executable, __file__, '--run-one', name, '--transport', transport, '--scale', str(scale)],
+        check=True, capture_output=True, text=True
+    )
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], tolerance: float) -> List[str]:
+    regressions = []
+    for key, result in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        if result['items_per_sec'] < previous['items_per_sec'] * (1 - tolerance):
+            regressions.append(f'{key}: items/sec {result["items_per_sec"]:.0f} < baseline {previous["items_per_sec"]:.0f}')
+        if result['p99_latency'] > previous['p99_latency'] * (1 + tolerance):
+            regressions.append(f'{key}: p99 latency {result["p99_latency"]:.4f}s > baseline {previous["p99_latency"]:.4f}s')
+    return regressions
+
+
+def print_table(results: Dict[str, Dict[str, float]]) -> None:
+    print(f'{"scenario":<36}{"items/s":>12}{"p50 (ms)":>11}{"p99 (ms)":>11}{"startup":>9}{"teardown":>10}{"rss (MB)":>10}')
+    for key, result in results.items():
+        rss = result['driver_peak_rss_mb'] + result['worker_peak_rss_mb']
+        print(f'{key:<36}{result["items_per_sec"]:>12.0f}{result["p50_latency"] * 1000:>11.2f}{result["p99_latency"] * 1000:>11.2f}'
+              f'{result.get("startup", 0.0):>9.2f}{result.get("teardown", 0.0):>10.2f}{rss:>10.1f}')
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenario', action='append', choices=[*SCENARIOS, 'maybe_chain'], help='defaults to every scenario')
+    parser.add_argument('--transport', action='append', choices=TRANSPORTS, help='defaults to every transport')
+    parser.add_argument('--scale', type=float, default=1.0, help='multiplies the amount of items of every scenario')
+    parser.add_argument('--save', help='write the results to this json file')
+    parser.add_argument('--compare', help='compare with a json file written by --save')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help='allowed relative regression')
+    parser.add_argument('--run-one', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        print(json.dumps(run_one(args.run_one, args.transport[0], args.scale)))
+        return 0
+
+    results = {}
+    for name in args.scenario or [*SCENARIOS, 'maybe_chain']:
+        for transport in args.transport or TRANSPORTS:
+            results[f'{name}[{transport}]'] = run_isolated(name, transport, args.scale)
+    print_table(results)
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as baseline_file:
+            json.dump(results, baseline_file, indent=2)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
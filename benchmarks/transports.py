@@ -0,0 +1,34 @@
+from time import perf_counter
+
+from queue_automator import QueueAutomator
+
+ITEMS = 20000
+STAGES = 4
+
+
+def add_one(item: int) -> int:
+    return item + 1
+
+
+def build_automator(transport: str) -> QueueAutomator:
+    automator = QueueAutomator(transport, transport=transport)
+    for stage in range(STAGES):
+        input_name = 'input' if stage == 0 else f'stage_{stage}'
+        output_name = 'output' if stage == STAGES - 1 else f'stage_{stage + 1}'
+        automator.register_as_worker_function(input_name, output_name, process_count=2)(add_one)
+    return automator
+
+
+if __name__ == '__main__':
+    baseline = None
+    for transport in ('manager', 'pipe', 'shm_ring'):
+        automator = build_automator(transport)
+        automator.set_input_data(range(ITEMS))
+        start = perf_counter()
+        results = automator.run()
+        elapsed = perf_counter() - start
+        assert len(results) == ITEMS
+
+        rate = ITEMS / elapsed
+        baseline = baseline or rate
+        print(f'{transport:>10}: {rate:10.0f} items/s ({rate / baseline:0.1f}x manager)')
@@ -1,12 +1,28 @@
+import asyncio
 import logging
-from multiprocessing import JoinableQueue, Manager, Process, Queue
-from multiprocessing.managers import SyncManager
-from typing import Callable, Dict, Iterable, List, Sequence, Union
+import queue as local_queue
+from itertools import count
+from multiprocessing import JoinableQueue, Process, Queue, resource_tracker
+from os import cpu_count
+from secrets import token_hex
+from threading import Event, Thread
+from time import perf_counter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Sequence, Tuple, Union
 
-from .constants import QueueFlags, QueueNames
+from .autoscaling import Autoscaler
+from .batching import Batch, gather_messages, is_exit, iter_batches, repack, unpack
+from .constants import Executors, ProcessCounts, QueueFlags, QueueNames, Transports
+from .jobs import SPLITTABLE_WEIGHT, Failure, Job, Task, split_weight
+from .payloads import cleanup, release, resolve, share
+from .recovery import InFlight, call_with_retries, describe_error
+from .stats import PipelineStats, StageCounters
+from .transports import create_transport
 
 logger = logging.getLogger('QueueAutomator')
 
+DEFAULT_MAXSIZE = 1000
+MONITOR_INTERVAL = 0.5
+
 
 class QueueAutomator:
     """
@@ -15,7 +31,7 @@ class QueueAutomator:
 
     Example:
 
-    >>> automator = QueueAutomator()
+    >>> automator = QueueAutomator()  # or QueueAutomator(transport='pipe')
     >>>
     >>> @automator.register_as_worker_function(output_queue_name='queue', process_count=2)
     >>> def do_work(item):
@@ -28,19 +44,55 @@ class QueueAutomator:
     >>> if __name__ == '__main__':
     >>>     automator.set_input_data([...]])
     >>>     results = automator.run()
+    >>>
+    >>>     # or keep the workers alive between runs
+    >>>     with automator:
+    >>>         first, second = automator.submit([...]), automator.submit([...])
+    >>>         results = first.result() + second.result()
 
     """
 
-    def __init__(self, name: Union[str, None] = None) -> None:
+    def __init__(self, name: Union[str, None] = None, transport: str = Transports.MANAGER,
+                 core_budget: Union[int, None] = None, monitor_interval: float = MONITOR_INTERVAL,
+                 stats_callback: Union[Callable[[PipelineStats], Any], None] = None,
+                 shared_memory_threshold: Union[int, None] = None, fuse_threshold: Union[float, None] = None) -> None:
         self.__queue_table: Dict[str, dict] = {
             QueueNames.OUTPUT: {
                 'target': None,
                 'process_count': None,
                 'worker_function': None,
-                'data': None
+                'data': None,
+                'options': {}
             },
         }
+        if transport not in (Transports.MANAGER, Transports.PIPE, Transports.SHM_RING):
+            raise ValueError(f'{transport} is not a valid transport, use one of manager, pipe or shm_ring')
+
         self.name = name or ''
+        self.transport = transport
+        self.core_budget = core_budget or cpu_count() or 1
+        self.monitor_interval = monitor_interval
+        self.stats_callback = stats_callback
+        self.shared_memory_threshold = shared_memory_threshold
+        self.fuse_threshold = fuse_threshold
+        self.__fused_into: Dict[str, str] = {}
+        self.__fused_chains: Dict[str, List[str]] = {}
+        self.__shm_prefix = ''
+        self.__task_weight = 1
+        self.__manager: Any = None
+        self.__process_per_queue: tuple = ()
+        self.__collector: Union[Thread, None] = None
+        self.__monitor: Union[Thread, None] = None
+        self.__stop_monitor = Event()
+        self.__draining = Event()
+        self.__in_flight: Dict[Process, InFlight] = {}
+        self.dead_letters: List[Failure] = []
+        self.__retiring: Dict[str, int] = {}
+        self.__started_at = 0.0
+        self.__peak_depths: Dict[str, int] = {}
+        self.__last_stats: Union[PipelineStats, None] = None
+        self.__jobs: Dict[int, Job] = {}
+        self.__job_ids = count()
 
     def __repr__(self) -> str:
         return f'QueueAutomator[{self.name}]'
@@ -50,80 +102,542 @@ class QueueAutomator:
             if not arg:
                 raise ValueError(f'{arg} should not be empty or zero')
 
-    def __build_queue(self, name: str, target: str, process_count: int, worker_function: Callable) -> dict:
+    def __build_queue(self, name: str, target: str, process_count: int, worker_function: Callable, options: Union[dict, None] = None) -> dict:
         return {
             name: {
                 'target': target,
                 'process_count': process_count,
                 'worker_function': worker_function,
-                'data': None
+                'data': None,
+                'options': options or {}
             }
         }
 
-    def __generate_queues(self, queues: list, manager: SyncManager, name: str) -> None:
-        if name == QueueNames.OUTPUT:
-            self.__queue_table[name]['queue'] = manager.Queue(0)
+    def __runs_in_driver(self, name: Union[str, None]) -> bool:
+        if name is None:
+            return True
+        return self.__queue_table[name]['options'].get('executor', Executors.PROCESS) != Executors.PROCESS
+
+    def __targets(self, name: str) -> Tuple[str, ...]:
+        target = self.__queue_table[name]['target']
+        return (target,) if isinstance(target, str) else tuple(target or ())
+
+    def __producers(self, name: str) -> List[str]:
+        return [queue_name for queue_name in self.__queue_table if name in self.__targets(queue_name)]
+
+    def __fusion_target(self, queue_name: str) -> Union[str, Tuple[str, ...]]:
+        # a stage that absorbed others sends its results where the last fused stage would have sent them
+        chain = self.__fused_chains.get(queue_name)
+        return self.__queue_table[chain[-1] if chain else queue_name]['target']
+
+    def __can_fuse(self, producer: str, queue_name: str) -> bool:
+        producer_options = self.__queue_table[producer]['options']
+        options = self.__queue_table[queue_name]['options']
+        executor = options.get('executor', Executors.PROCESS)
+        return (
+            queue_name != QueueNames.INPUT
+            and self.__targets(producer) == (queue_name,)
+            and self.__producers(queue_name) == [producer]
+            and self.__queue_table[queue_name]['data'] is None
+            and not options.get('join')
+            and executor != Executors.ASYNCIO
+            and executor == producer_options.get('executor', Executors.PROCESS)
+        )
+
+    def __measured_cost(self, queue_name: str) -> Union[float, None]:
+        if self.__last_stats is None or queue_name not in self.__last_stats.stages:
+            return None
+        stage = self.__last_stats[queue_name]
+        return stage.busy_time / stage.items_in if stage.items_in else None
+
+    def __plan_fusion(self) -> None:
+        # optimizer pass: fold stages into the stage that feeds them when they were marked with fuse=True,
+        # or when the last run measured both as cheaper per item than fuse_threshold
+        self.__fused_into = {}
+        self.__fused_chains = {}
+        if QueueNames.INPUT not in self.__queue_table:
             return
 
-        if name not in self.__queue_table:
-            raise RuntimeError(f'{name} does not exist in queue map, register a worker function with input_queue_name={name}')
+        for queue_name in self.__topological_order(QueueNames.INPUT):
+            producers = self.__producers(queue_name)
+            wants_fusion = self.__queue_table[queue_name]['options'].get('fuse', False)
+            if not wants_fusion and self.fuse_threshold is not None and len(producers) == 1:
+                costs = (self.__measured_cost(producers[0]), self.__measured_cost(queue_name))
+                wants_fusion = all(cost is not None and cost < self.fuse_threshold for cost in costs)
+            if not wants_fusion:
+                continue
+
+            if len(producers) != 1 or not self.__can_fuse(producers[0], queue_name):
+                logger.warning(f'{queue_name} cannot be fused, it needs a single producer with the same executor that only feeds it')
+                continue
 
-        current_queue = self.__queue_table[name]
+            head = self.__fused_into.get(producers[0], producers[0])
+            self.__fused_into[queue_name] = head
+            self.__fused_chains.setdefault(head, []).append(queue_name)
+            logger.debug(f'Fusing {queue_name} into the workers of {head}')
 
-        if current_queue.get('queue'):
-            raise RuntimeError(f'{name} was already created, you may be creating a circular pipeline')
+    def __topological_order(self, name: str) -> List[str]:
+        # depth first search from name, every stage comes after all the stages that feed it
+        order: List[str] = []
+        visiting: set = set()
+        visited: set = set()
 
-        next_queue = current_queue['target']
-        current_queue['queue'] = manager.JoinableQueue()  # type: ignore
-        queues.append((name, next_queue))
+        def visit(queue_name: str) -> None:
+            if queue_name == QueueNames.OUTPUT or queue_name in visited:
+                return
+            if queue_name in visiting:
+                raise RuntimeError(f'{queue_name} feeds itself, circular pipelines are not supported')
+            if queue_name not in self.__queue_table:
+                raise RuntimeError(f'{queue_name} does not exist in queue map, register a worker function with input_queue_name={queue_name}')
+            visiting.add(queue_name)
+            for target in self.__targets(queue_name):
+                visit(target)
+            visiting.discard(queue_name)
+            visited.add(queue_name)
+            order.append(queue_name)
 
-        return self.__generate_queues(queues, manager, next_queue)
+        visit(name)
+        return order[::-1]
 
-    def __enqueue_data(self) -> None:
+    def __generate_queues(self, queues: list, manager: Any, name: str, maxsize: int = 0) -> None:
+        # A queue whose producers and consumer all run as threads of this process does not need to
+        # serialize anything, a plain queue.Queue hands the objects over as they are
+        if name != QueueNames.OUTPUT:
+            for queue_name in self.__topological_order(name):
+                current_queue = self.__queue_table[queue_name]
 
-        for queue_name, queue_data in self.__queue_table.items():
+                if current_queue.get('queue'):
+                    raise RuntimeError(f'{queue_name} was already created, you may be creating a circular pipeline')
 
-            queue = queue_data.get('queue')
-            if not queue:
-                RuntimeError('enqueue_data was called for a non existent queue, this should not happen')
+                if queue_name in self.__fused_into:
+                    current_queue['counters'] = StageCounters()
+                    continue
 
-            data = queue_data.get('data', [])
-            if not data:
-                if queue_name == QueueNames.INPUT:
-                    RuntimeError('data for input queue is empty, nothing to process')
-                continue
+                local = self.__runs_in_driver(queue_name) and all(self.__runs_in_driver(producer) for producer in self.__producers(queue_name))
+                stage_maxsize = current_queue['options'].get('maxsize')
+                queue_maxsize = maxsize if stage_maxsize is None else stage_maxsize
+                current_queue['queue'] = local_queue.Queue(queue_maxsize) if local else manager.JoinableQueue(queue_maxsize)  # type: ignore
+                current_queue['counters'] = StageCounters()
+                queues.append((queue_name, self.__fusion_target(queue_name)))
+
+        output_queue = self.__queue_table[QueueNames.OUTPUT]
+        if not output_queue.get('queue'):
+            local = all(self.__runs_in_driver(producer) for producer in self.__producers(QueueNames.OUTPUT))
+            output_queue['queue'] = local_queue.Queue(maxsize) if local else manager.Queue(maxsize)
+
+    def __sharing_for(self, queue: Any) -> Union[tuple, None]:
+        # objects put in a plain queue.Queue are handed over as they are, copying them to shared memory would only cost time
+        if self.shared_memory_threshold is None or isinstance(queue, local_queue.Queue):
+            return None
+        return self.__shm_prefix, self.shared_memory_threshold
+
+    def __feed_queue(self, job: Job, queue: JoinableQueue, data: Iterable, batch_size: int) -> None:
+        sharing = self.__sharing_for(queue)
+        try:
+            for message in iter_batches((Task(job.id, share(item, sharing), job._reserve_seq(), job.weight) for item in data), batch_size):
+                if job.cancelled:
+                    break
+                job._add_pending(len(unpack(message)) * job.weight)
+                queue.put(message)
+        except Exception as error:
+            logger.exception(f'Feeding input data for {job} failed')
+            job.errors.append(error)
+        finally:
+            job._feeder_done()
+            if job.done():
+                self.__jobs.pop(job.id, None)
+
+    def __submit(self, sources: Dict[str, Iterable], maxsize: int = 0, ordered: bool = False, window: Union[int, None] = None) -> Job:
+        if self.__manager is None:
+            raise RuntimeError(f'{self} is not started, call start() before submitting data')
+
+        for queue_name in sources:
+            if queue_name in self.__fused_into:
+                raise RuntimeError(f'{queue_name} was fused into {self.__fused_into[queue_name]} and has no queue to submit data to')
+
+        job = Job(next(self.__job_ids), maxsize, ordered, window, self.__task_weight)
+        self.__jobs[job.id] = job
+
+        for queue_name, data in sources.items():
+            queue_data = self.__queue_table[queue_name]
+            batch_size = queue_data['options'].get('batch_size', 1)
+            logger.debug(f'Feeding queue {queue_name} for {job} in batches of {batch_size}')
+            feeder = Thread(target=self.__feed_queue, args=(job, queue_data['queue'], data, batch_size), daemon=True)
+            job._add_feeder(feeder)
+            feeder.start()
+
+        job._feeder_done()
+        return job
 
-            logger.debug(f'Inserting {len(data)} items in queue {queue_name}')
-            for item in data:
-                queue.put(item)  # type: ignore
+    def _process_enqueued_objects(self, in_queue: JoinableQueue, out_queues: Union[Queue, Dict[str, Queue]], worker_function: Callable,
+                                  options: Union[dict, None] = None, counters: Union[StageCounters, None] = None,
+                                  in_flight: Union[InFlight, None] = None) -> None:
 
-    def _process_enqueued_objects(self, in_queue: JoinableQueue, out_queue: Queue, worker_function: Callable) -> None:
+        options = options or {}
+        batch_size = options.get('batch_size', 1)
+        max_batch_latency = options.get('max_batch_latency')
+        if not isinstance(out_queues, dict):
+            out_queues = {QueueNames.OUTPUT: out_queues}
+
+        blocks: list = []
+        pieces: dict = {}
 
         while True:
-            input_object = in_queue.get()
-            if input_object != QueueFlags.EXIT:
-                result = worker_function(input_object)
-                out_queue.put(result)
+            started = perf_counter()
+            messages, exiting = gather_messages(in_queue, batch_size, max_batch_latency)
+            get_time = perf_counter() - started
+            items_in, items_out, latencies, put_time = 0, 0, [], 0.0
+
+            if messages:
+                items_in, items_out, latencies, put_time = self.__run_worker_function(
+                    messages, out_queues, worker_function, options, blocks, pieces, in_flight
+                )
+                # the views over the shared memory of the inputs are gone once the round returns
+                release(blocks)
+
+            if counters is not None:
+                counters.add(items_in, items_out, sum(latencies), get_time, put_time, latencies)
+
+            for _ in range(len(messages) + exiting):
                 in_queue.task_done()
+
+            if exiting:
+                logger.debug('_>>> Done <<<_')
+                return
+
+    def __join_pieces(self, tasks: List[Task], payloads: list, pieces: dict, upstreams: Tuple[str, ...]) -> Tuple[List[Task], list]:
+        # pieces of the same input item wait here until every upstream stage delivered its result
+        joined_tasks, joined_payloads = [], []
+        for task, payload in zip(tasks, payloads):
+            if task.source not in upstreams:
+                raise ValueError(f'a join stage only takes results of its upstream stages {upstreams}, got an item from {task.source}')
+            slot = pieces.setdefault((task.job, task.seq), [0, {}])
+            slot[0] += task.weight
+            slot[1][task.source] = payload
+            if len(slot[1]) == len(upstreams):
+                weight, by_source = pieces.pop((task.job, task.seq))
+                failures = [piece for piece in by_source.values() if isinstance(piece, Failure)]
+                joined_tasks.append(task._replace(payload=None, weight=weight))
+                joined_payloads.append(failures[0] if failures else {source: by_source[source] for source in upstreams})
+        return joined_tasks, joined_payloads
+
+    def __route(self, route: Callable, result: Any, out_queues: Dict[str, Queue]) -> List[str]:
+        names = route(result)
+        names = [names] if isinstance(names, str) else list(names)
+        if not names or any(name not in out_queues for name in names):
+            raise ValueError(f'route returned {names} for {result}, it should return one or more of {list(out_queues)}')
+        return names
+
+    def __destinations(self, route: Union[Callable, None], result: Any, out_queues: Dict[str, Queue], stage: Union[str, None]) -> Tuple[Any, List[str]]:
+        # failures go to every output, so a join further down still receives a piece from each branch
+        if route is None or isinstance(result, Failure):
+            return result, list(out_queues)
+        try:
+            return result, self.__route(route, result, out_queues)
+        except Exception as error:
+            logger.exception(f'The route of {stage} failed')
+            return describe_error(stage, result, error, 1), list(out_queues)
+
+    def __emit_results(self, messages: list, tasks: List[Task], results: list, out_queues: Dict[str, Queue], options: dict) -> None:
+        route = options.get('route')
+        sharing = options.get('sharing') or {}
+        joins = options.get('joins') or ()
+        stage = options.get('stage')
+
+        outputs: Dict[str, list] = {name: [] for name in out_queues}
+        for task, result in zip(tasks, results):
+            result, names = self.__destinations(route, result, out_queues, stage)
+            weights = split_weight(task.weight, len(names)) if len(names) > 1 else (task.weight,)
+            for name, weight in zip(names, weights):
+                outputs[name].append(task._replace(payload=share(result, sharing.get(name)), weight=weight,
+                                                   source=stage if name in joins else None))
+
+        for name, items in outputs.items():
+            if items:
+                out_queues[name].put(repack(messages, items))
+
+    def __call_worker_function(self, worker_function: Callable, payloads: list, vectorized: bool, stage: Union[str, None],
+                               retries: int = 0, backoff: float = 0.0) -> Tuple[list, List[float]]:
+        # failures of earlier stages pass through as they are, the function only gets the other items
+        results = list(payloads)
+        indexes = [index for index, payload in enumerate(payloads) if not isinstance(payload, Failure)]
+        latencies: List[float] = []
+        if not indexes:
+            return results, latencies
+
+        if vectorized:
+            started = perf_counter()
+            batch = call_with_retries(lambda items: list(worker_function(items)), [payloads[index] for index in indexes], retries, backoff, stage)
+            if isinstance(batch, Failure):
+                # find the items that fail on their own, so the rest of the batch still gets through
+                batch = [call_with_retries(lambda item: list(worker_function([item]))[0], payloads[index], 0, 0.0, stage) for index in indexes]
+            for index, result in zip(indexes, batch):
+                results[index] = result
+            latencies = [(perf_counter() - started) / len(indexes)] * len(indexes)
+        else:
+            for index in indexes:
+                started = perf_counter()
+                results[index] = call_with_retries(worker_function, payloads[index], retries, backoff, stage)
+                latencies.append(perf_counter() - started)
+
+        for index in indexes:
+            if isinstance(results[index], Failure):
+                logger.error(f'The worker function of {stage} failed after {results[index].attempts} attempts: {results[index].error}')
+        return results, latencies
+
+    def __run_worker_function(self, messages: list, out_queues: Dict[str, Queue], worker_function: Callable,
+                              options: dict, blocks: list, pieces: dict, in_flight: Union[InFlight, None] = None) -> tuple:
+        tasks = [task for message in messages for task in unpack(message)]
+        if in_flight is not None:
+            in_flight.record(len(messages), tasks)
+        payloads = [resolve(task.payload, blocks) for task in tasks]
+        items_in = len(tasks)
+        retries, backoff = options.get('retries', 0), options.get('retry_backoff', 0.0)
+
+        if options.get('upstreams'):
+            tasks, payloads = self.__join_pieces(tasks, payloads, pieces, options['upstreams'])
+            if not tasks:
+                if in_flight is not None:
+                    in_flight.clear()
+                return items_in, 0, [], 0.0
+
+        results, latencies = self.__call_worker_function(
+            worker_function, payloads, options.get('vectorized', False), options.get('stage'), retries, backoff
+        )
+
+        # the stages fused into this one run right here, each one keeps its own counters
+        for stage, fused_function, vectorized, counters in options.get('fused', ()):
+            fused_results, fused_latencies = self.__call_worker_function(fused_function, results, vectorized, stage, retries, backoff)
+            if counters is not None:
+                counters.add(len(results), len(fused_results), sum(fused_latencies), latencies=fused_latencies)
+            results = fused_results
+
+        started = perf_counter()
+        self.__emit_results(messages, tasks, results, out_queues, options)
+        if in_flight is not None:
+            in_flight.clear()
+        return items_in, len(results), latencies, perf_counter() - started
+
+    async def __process_coroutine_messages(self, messages: list, in_queue: JoinableQueue, out_queues: Dict[str, Queue],
+                                           worker_function: Callable, options: dict, counters: Union[StageCounters, None]) -> None:
+        loop = asyncio.get_running_loop()
+        vectorized = options.get('vectorized', False)
+        blocks: list = []
+        tasks = [task for message in messages for task in unpack(message)]
+        payloads = [resolve(task.payload, blocks) for task in tasks]
+        latencies: List[float] = []
+
+        stage, retries, backoff = options.get('stage'), options.get('retries', 0), options.get('retry_backoff', 0.0)
+
+        async def timed_call(payload: Any) -> Any:
+            if isinstance(payload, Failure):
+                return payload
+            started = perf_counter()
+            for attempt in range(retries + 1):
+                try:
+                    result = await worker_function(payload)
+                    break
+                except Exception as error:
+                    if attempt == retries:
+                        result = describe_error(stage, payload, error, attempt + 1)
+                        logger.error(f'The worker function of {stage} failed after {attempt + 1} attempts: {error!r}')
+                        break
+                    await asyncio.sleep(backoff * 2 ** attempt)
+            latencies.append(perf_counter() - started)
+            return result
+
+        if vectorized:
+            started = perf_counter()
+            indexes = [index for index, payload in enumerate(payloads) if not isinstance(payload, Failure)]
+            results = list(payloads)
+            try:
+                for index, result in zip(indexes, await worker_function([payloads[index] for index in indexes]) if indexes else ()):
+                    results[index] = result
+            except Exception as error:
+                logger.error(f'The worker function of {stage} failed: {error!r}')
+                for index in indexes:
+                    results[index] = describe_error(stage, payloads[index], error, 1)
+            latencies = [(perf_counter() - started) / len(tasks)] * len(tasks)
+        else:
+            results = await asyncio.gather(*(timed_call(payload) for payload in payloads))
+
+        started = perf_counter()
+        await loop.run_in_executor(None, self.__emit_results, messages, tasks, results, out_queues, options)
+        release(blocks)
+        if counters is not None:
+            counters.add(len(tasks), len(results), sum(latencies), put_time=perf_counter() - started, latencies=latencies)
+        for _ in messages:
+            in_queue.task_done()
+
+    async def __consume_coroutines(self, in_queue: JoinableQueue, out_queues: Dict[str, Queue], worker_function: Callable,
+                                   options: dict, counters: Union[StageCounters, None]) -> None:
+        loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(options.get('concurrency', 1))
+        in_flight: set = set()
+
+        while True:
+            await slots.acquire()
+            started = perf_counter()
+            messages, exiting = await loop.run_in_executor(
+                None, gather_messages, in_queue, options.get('batch_size', 1), options.get('max_batch_latency')
+            )
+            if counters is not None:
+                counters.add(0, 0, 0.0, get_time=perf_counter() - started)
+            if messages:
+                future = asyncio.ensure_future(
+                    self.__process_coroutine_messages(messages, in_queue, out_queues, worker_function, options, counters)
+                )
+                in_flight.add(future)
+                future.add_done_callback(in_flight.discard)
+                future.add_done_callback(lambda _: slots.release())
             else:
+                slots.release()
+
+            if exiting:
+                await asyncio.gather(*in_flight)
                 in_queue.task_done()
                 logger.debug('_>>> Done <<<_')
                 return
 
-    def __spawn_processes(self, in_queue_name: str, out_queue_name: str) -> List[Process]:
+    def _process_enqueued_coroutines(self, in_queue: JoinableQueue, out_queues: Union[Queue, Dict[str, Queue]], worker_function: Callable,
+                                     options: Union[dict, None] = None, counters: Union[StageCounters, None] = None) -> None:
+        if not isinstance(out_queues, dict):
+            out_queues = {QueueNames.OUTPUT: out_queues}
+        asyncio.run(self.__consume_coroutines(in_queue, out_queues, worker_function, options or {}, counters))
+
+    def __out_queues(self, out_queue_names: Union[str, Sequence[str]]) -> Dict[str, Any]:
+        return {name: self.__queue_table[name]['queue'] for name in ((out_queue_names,) if isinstance(out_queue_names, str) else out_queue_names)}
+
+    def __worker_options(self, in_queue_name: str, out_queues: Dict[str, Any]) -> dict:
+        in_queue = self.__queue_table[in_queue_name]
+        fused = [(name, self.__queue_table[name]) for name in self.__fused_chains.get(in_queue_name, ())]
+        return dict(
+            in_queue['options'],
+            route=fused[-1][1]['options'].get('route') if fused else in_queue['options'].get('route'),
+            fused=tuple((name, stage['worker_function'], stage['options'].get('vectorized', False), stage.get('counters')) for name, stage in fused),
+            stage=in_queue_name,
+            sharing={name: self.__sharing_for(queue) for name, queue in out_queues.items()},
+            joins=tuple(name for name in out_queues if self.__queue_table[name]['options'].get('join')),
+            upstreams=tuple(self.__producers(in_queue_name)) if in_queue['options'].get('join') else ()
+        )
+
+    def __spawn_processes(self, in_queue_name: str, out_queue_names: Union[str, Sequence[str]],
+                          amount: Union[int, None] = None) -> List[Union[Process, Thread]]:
         in_queue = self.__queue_table[in_queue_name]
-        out_queue = self.__queue_table[out_queue_name]
-        target = self._process_enqueued_objects
+        out_queues = self.__out_queues(out_queue_names)
+        options = self.__worker_options(in_queue_name, out_queues)
+        args = (in_queue['queue'], out_queues, in_queue['worker_function'], options, in_queue.get('counters'))
+        executor = in_queue['options'].get('executor', Executors.PROCESS)
 
-        process_list = list()
-        for _ in range(in_queue['process_count']):
-            process = Process(target=target, args=(in_queue['queue'], out_queue['queue'], in_queue['worker_function']))
+        process_list: List[Union[Process, Thread]] = list()
+        if executor == Executors.THREAD:
+            process_list.extend(Thread(target=self._process_enqueued_objects, args=args, daemon=True)
+                                for _ in range(in_queue['options'].get('concurrency', 1)))
+        elif executor == Executors.ASYNCIO:
+            process_list.append(Thread(target=self._process_enqueued_coroutines, args=args, daemon=True))
+        else:
+            process_count = in_queue['process_count'] if amount is None else amount
+            # a message holds up to the batch size of the stage that produced it, a round gathers up to this stage's batch size
+            capacity = in_queue['options'].get('batch_size', 1) + max(stage['options'].get('batch_size', 1) for stage in self.__queue_table.values())
+            for _ in range(process_count):
+                in_flight = InFlight(capacity)
+                process = Process(target=self._process_enqueued_objects, args=(*args, in_flight))
+                self.__in_flight[process] = in_flight
+                process_list.append(process)
+
+        for process in process_list:
             process.start()
-            process_list.append(process)
             logger.debug(f'Started {process.name} for queue {in_queue_name}')
 
         return process_list
 
+    def __queue_depth(self, queue: Any) -> int:
+        try:
+            return queue.qsize()
+        except NotImplementedError:
+            return 0
+
+    def __recover_tasks(self, queue_name: str, in_flight: InFlight, exitcode: Union[int, None]) -> None:
+        # the dead worker never finished these tasks, fail them so their jobs and the queue join can complete
+        messages, tasks = in_flight.lost()
+        if tasks:
+            out_queues = self.__out_queues(self.__fusion_target(queue_name))
+            failures = [Failure(queue_name, None, f'the worker process died with exit code {exitcode}') for _ in tasks]
+            self.__emit_results([Batch()], tasks, failures, out_queues, self.__worker_options(queue_name, out_queues))
+        for _ in range(messages):
+            self.__queue_table[queue_name]['queue'].task_done()
+
+    def __prune_processes(self, queue_name: str, process_list: list) -> None:
+        for process in [process for process in process_list if isinstance(process, Process) and not process.is_alive()]:
+            if process.exitcode == 0 and self.__draining.is_set():
+                # stopped by shutdown, it stays in the list so the last stats still count it
+                continue
+            process.join()
+            process_list.remove(process)
+            in_flight = self.__in_flight.pop(process, None)
+
+            if process.exitcode == 0:
+                self.__retiring[queue_name] = max(self.__retiring.get(queue_name, 0) - 1, 0)
+                continue
+
+            logger.error(f'{process.name} of {queue_name} died with exit code {process.exitcode}, starting a new one')
+            if in_flight is not None:
+                self.__recover_tasks(queue_name, in_flight, process.exitcode)
+            process_list.extend(self.__spawn_processes(queue_name, self.__fusion_target(queue_name), 1))
+
+    def __active_processes(self, queue_name: str, process_list: list) -> int:
+        return len(process_list) - self.__retiring.get(queue_name, 0)
+
+    def __autoscale(self, autoscaler: Autoscaler, process_lists: Dict[str, list], elapsed: float) -> None:
+        changes = autoscaler.plan(
+            {queue_name: self.__queue_table[queue_name]['counters'].snapshot() for queue_name in autoscaler.bounds},
+            {queue_name: self.__queue_depth(self.__queue_table[queue_name]['queue']) for queue_name in autoscaler.bounds},
+            {queue_name: self.__active_processes(queue_name, process_lists[queue_name]) for queue_name in autoscaler.bounds},
+            sum(self.__active_processes(queue_name, process_list) for queue_name, process_list in process_lists.items()
+                if not self.__runs_in_driver(queue_name)),
+            elapsed
+        )
+
+        for queue_name, change in changes.items():
+            current_queue = self.__queue_table[queue_name]
+            if change > 0:
+                process_lists[queue_name].extend(self.__spawn_processes(queue_name, self.__fusion_target(queue_name), 1))
+            else:
+                current_queue['queue'].put(QueueFlags.EXIT)
+                self.__retiring[queue_name] = self.__retiring.get(queue_name, 0) + 1
+            logger.debug(f'Autoscaling {queue_name} to {self.__active_processes(queue_name, process_lists[queue_name])} processes')
+
+    def __report_stats(self) -> None:
+        if self.stats_callback is None:
+            return
+        try:
+            self.stats_callback(self.stats())
+        except Exception:
+            logger.exception('stats_callback failed')
+
+    def __monitor_pipeline(self, autoscaler: Union[Autoscaler, None]) -> None:
+        last_sample = perf_counter()
+
+        while not self.__stop_monitor.wait(self.monitor_interval):
+            now = perf_counter()
+            process_lists = dict(self.__process_per_queue)
+            for queue_name, process_list in process_lists.items():
+                self.__prune_processes(queue_name, process_list)
+                depth = self.__queue_depth(self.__queue_table[queue_name]['queue'])
+                self.__peak_depths[queue_name] = max(self.__peak_depths.get(queue_name, 0), depth)
+
+            if autoscaler is not None and not self.__draining.is_set():
+                self.__autoscale(autoscaler, process_lists, now - last_sample)
+            last_sample = now
+
+            self.__report_stats()
+
+    def __stop_monitor_thread(self) -> None:
+        if self.__monitor is not None:
+            self.__stop_monitor.set()
+            self.__monitor.join()
+            self.__monitor = None
+
     def __join_processes(self, process_list: list) -> None:
         for process in process_list:
             process.join()
@@ -132,13 +646,26 @@ class QueueAutomator:
         for _ in range(num_processes):
             queue.put(QueueFlags.EXIT)
 
-    def __recover_from_queue(self, queue: Queue, manager: bool = False) -> list:
-        results = []
-        while not queue.empty():
-            results.append(queue.get())
-            if manager:
-                queue.task_done()
-        return results
+    def __iter_results(self, queue: Queue) -> Iterator[Any]:
+        while True:
+            message = queue.get()
+            if is_exit(message):
+                return
+            yield from unpack(message)
+
+    def __collect_results(self, queue: Queue) -> None:
+        blocks: list = []
+        for task in self.__iter_results(queue):
+            # results leave the pipeline as copies, so every shared memory block is released right here
+            payload = resolve(task.payload, blocks, copy=True)
+            if blocks:
+                release(blocks)
+            job = self.__jobs.get(task.job)
+            if job is None:
+                continue
+            job._deliver(payload, task.seq, task.weight)
+            if job.done():
+                self.__jobs.pop(job.id, None)
 
     def set_data_for_queue(self, data: Iterable, queue: str) -> None:
 
@@ -162,19 +689,68 @@ class QueueAutomator:
         self.set_data_for_queue(input_data, QueueNames.INPUT)
 
     def register_as_worker_function(self, input_queue_name: str = QueueNames.INPUT,
-                                    output_queue_name: str = QueueNames.OUTPUT,
-                                    process_count: int = 1) -> Callable:
+                                    output_queue_name: Union[str, Sequence[str]] = QueueNames.OUTPUT,
+                                    process_count: Union[int, str] = 1,
+                                    batch_size: int = 1,
+                                    max_batch_latency: Union[float, None] = None,
+                                    vectorized: bool = False,
+                                    maxsize: Union[int, None] = None,
+                                    executor: str = Executors.PROCESS,
+                                    concurrency: int = 1,
+                                    min_processes: int = 1,
+                                    max_processes: Union[int, None] = None,
+                                    route: Union[Callable[[Any], Union[str, Sequence[str]]], None] = None,
+                                    join: bool = False,
+                                    fuse: bool = False,
+                                    retries: int = 0,
+                                    retry_backoff: float = 0.1) -> Callable:
         """
         Decorator to register your functions to process data as part of a multiprocessing queue pipeline
 
         Args:
             input_queue_name (str, optional): The name of the input queue for this function. Defaults to 'input'.
-            output_queue_name (Union[str, None], optional): the name of the output queue for this function. Defaults to None.
-            process_count (int, optional): The ammount of processes to listen to the given input queue. Defaults to 1.
+            output_queue_name (Union[str, Sequence[str]], optional): the name of the output queue for this function,
+                                                                 with several names every result is sent to all of them
+                                                                 unless a route is given. Defaults to 'output'.
+            process_count (Union[int, str], optional): The ammount of processes to listen to the given input queue.
+                                                       'auto' starts with min_processes and adds or retires processes depending on how
+                                                       busy this function is compared to the others, within the core_budget of the automator.
+                                                       Defaults to 1.
+            batch_size (int, optional): Max amount of items a worker takes from its queue at once,
+                                        the results are sent to the next queue as a single chunk. Defaults to 1.
+            max_batch_latency (Union[float, None], optional): Seconds a worker may wait for a batch to fill,
+                                                              when None only the items already waiting are batched. Defaults to None.
+            vectorized (bool, optional): Call the function once per batch with a list of items,
+                                         it must return a list of results in the same order. Defaults to False.
+            maxsize (Union[int, None], optional): Max amount of messages waiting in the input queue of this function,
+                                                  when None the size given to run_iter() is used. Defaults to None.
+            executor (str, optional): Where the function runs. 'process' spawns process_count processes,
+                                      'thread' runs concurrency threads and 'asyncio' runs an event loop with up to concurrency
+                                      coroutines in flight, both inside the process that runs the pipeline. Items passed between
+                                      thread or asyncio functions are not serialized. Defaults to 'process'.
+            concurrency (int, optional): Amount of threads or in flight coroutines for the 'thread' and 'asyncio' executors. Defaults to 1.
+            min_processes (int, optional): With process_count='auto', the least amount of processes. Defaults to 1.
+            max_processes (Union[int, None], optional): With process_count='auto', the max amount of processes,
+                                                        None means the core_budget of the automator. Defaults to None.
+            route (Union[Callable[[Any], Union[str, Sequence[str]]], None], optional): Called with every result, returns the output queue
+                                                                                      or output queues that receive it. Defaults to None.
+            join (bool, optional): Wait for the result of every stage that feeds input_queue_name for the same input item and call
+                                   the function once with a dict of them keyed by the input queue name of those stages.
+                                   A join runs a single worker. Defaults to False.
+            fuse (bool, optional): Run this function inside the workers of the stage that feeds input_queue_name, so items are passed
+                                   to it directly instead of through a queue. Only possible when that stage feeds nothing else,
+                                   nothing else feeds this one and both use the same executor. Defaults to False.
+            retries (int, optional): Times an item is tried again when the function raises, once every attempt failed the item
+                                     becomes a Failure kept in Job.failures or QueueAutomator.dead_letters. Defaults to 0.
+            retry_backoff (float, optional): Seconds to wait before the first retry, doubled before each one after it. Defaults to 0.1.
 
         Raises:
             RuntimeError: If input_queue_name is already registered, use unique names
-            ValueError: If input_queue_name is none or process_count is <= 0
+            ValueError: If input_queue_name is none, process_count is <= 0, batch_size or concurrency are < 1,
+                        the executor is unknown, an 'asyncio' function is not a coroutine function
+                        or process_count='auto' is used with invalid bounds or without the 'process' executor,
+                        output_queue_name repeats a name, route is not callable, a join runs more than one worker or asyncio
+                        or retries or retry_backoff are negative
 
         Returns:
             Callable: The wrapped function after registering it.
@@ -185,46 +761,314 @@ class QueueAutomator:
         if input_queue_name in self.__queue_table:
             raise RuntimeError(f'{input_queue_name} already exists in queue table, pick another name')
 
-        if process_count < 0:
-            raise ValueError('process_count cannot be a negative number')
+        autoscale = None
+        if process_count == ProcessCounts.AUTO:
+            if executor != Executors.PROCESS:
+                raise ValueError('process_count=auto is only supported by the process executor')
+            if min_processes < 1 or (max_processes is not None and max_processes < min_processes):
+                raise ValueError('min_processes should be at least 1 and not greater than max_processes')
+            autoscale = (min_processes, max_processes or self.core_budget)
+            process_count = min_processes
+
+        if not isinstance(process_count, int) or process_count < 0:
+            raise ValueError('process_count should be a positive number or auto')
+
+        if batch_size < 1:
+            raise ValueError('batch_size should be at least 1')
+
+        if concurrency < 1:
+            raise ValueError('concurrency should be at least 1')
+
+        if retries < 0 or retry_backoff < 0:
+            raise ValueError('retries and retry_backoff should not be negative')
+
+        if executor not in (Executors.PROCESS, Executors.THREAD, Executors.ASYNCIO):
+            raise ValueError(f'{executor} is not a valid executor, use one of process, thread or asyncio')
+
+        target: Union[str, Tuple[str, ...]] = output_queue_name if isinstance(output_queue_name, str) else tuple(output_queue_name)
+        if isinstance(target, tuple):
+            if len(set(target)) != len(target) or not all(target):
+                raise ValueError('output_queue_name should not repeat or contain empty names')
+            if len(target) == 1:
+                target = target[0]
+
+        if route is not None and not callable(route):
+            raise ValueError('route should be a function that returns the name of an output queue')
+
+        if join and (process_count != 1 or autoscale or concurrency != 1 or executor == Executors.ASYNCIO):
+            # the pieces of an item wait in the memory of the worker, so all of them must reach the same one
+            raise ValueError('a join runs a single process or thread worker, use process_count=1 and concurrency=1')
+
+        options = {
+            'batch_size': batch_size,
+            'max_batch_latency': max_batch_latency,
+            'vectorized': vectorized,
+            'maxsize': maxsize,
+            'executor': executor,
+            'concurrency': concurrency,
+            'autoscale': autoscale,
+            'route': route,
+            'join': join,
+            'fuse': fuse,
+            'retries': retries,
+            'retry_backoff': retry_backoff
+        }
 
         def store_in_queue_table_wrapper(func: Callable) -> Callable:
+            if executor == Executors.ASYNCIO and not asyncio.iscoroutinefunction(func):
+                raise ValueError(f'{func} should be an async function to use the asyncio executor')
+
             self.__queue_table.update(
-                self.__build_queue(input_queue_name, output_queue_name or QueueNames.OUTPUT, process_count, func)
+                self.__build_queue(input_queue_name, target, process_count, func, options)
             )
             return func
 
         return store_in_queue_table_wrapper
 
-    def run(self) -> list:
+    def start(self, maxsize: int = DEFAULT_MAXSIZE) -> 'QueueAutomator':
         """
-        Is the main entry point to execute your program
-        with a multiprocessing queue pipeline.
+        Creates the queues and spawns the workers of every registered function and keeps them alive
+        until shutdown() is called, use submit() to send data to the warm workers.
 
-        To use it you need to register at least 1 worker function
+        The queues between stages are created by the transport selected in the constructor:
+        'manager' uses proxy queues served by a multiprocessing.Manager, 'pipe' uses plain
+        multiprocessing queues and 'shm_ring' uses shared memory ring buffers.
 
-        Do not forget to call set_input_data(Iterable) before calling run()
+        Args:
+            maxsize (int, optional): Max amount of messages per queue, 0 means unbounded. Defaults to 1000.
+
+        Raises:
+            RuntimeError: If the automator is already started
 
         Returns:
-            list: The output as a simple python list
+            QueueAutomator: The started automator
         """
 
-        manager = Manager()
+        if self.__manager is not None:
+            raise RuntimeError(f'{self} is already started')
+
+        manager = create_transport(self.transport)
         queues: List[tuple] = []
 
-        self.__generate_queues(queues, manager, QueueNames.INPUT)
+        self.__manager = manager
+        self.__shm_prefix = f'qa{token_hex(4)}'
+        if self.shared_memory_threshold is not None:
+            # the workers must inherit one resource tracker, otherwise the tracker of the process that created
+            # a block reports it as leaked after the process that consumed it unlinked it
+            resource_tracker.ensure_running()
+        try:
+            self.__plan_fusion()
+            self.__generate_queues(queues, manager, QueueNames.INPUT, maxsize)
+            self.__task_weight = SPLITTABLE_WEIGHT if any(not isinstance(target, str) for _, target in queues) else 1
+            self.__process_per_queue = tuple((input_queue, self.__spawn_processes(input_queue, output_queue)) for input_queue, output_queue in queues)
+        except Exception:
+            self.shutdown(wait=False)
+            raise
 
-        process_per_queue = tuple((input_queue, self.__spawn_processes(input_queue, output_queue)) for input_queue, output_queue in queues)
+        self.__collector = Thread(target=self.__collect_results, args=(self.__queue_table[QueueNames.OUTPUT]['queue'],), daemon=True)
+        self.__collector.start()
 
-        self.__enqueue_data()
+        bounds = {
+            queue_name: self.__queue_table[queue_name]['options']['autoscale'] for queue_name, _ in queues
+            if self.__queue_table[queue_name]['options'].get('autoscale')
+        }
+        self.__started_at = perf_counter()
+        self.__peak_depths = {}
+        self.__stop_monitor.clear()
+        self.__monitor = Thread(target=self.__monitor_pipeline, args=(Autoscaler(bounds, self.core_budget) if bounds else None,), daemon=True)
+        self.__monitor.start()
 
-        for queue_name, procesess in process_per_queue:
-            current_queue = self.__queue_table[queue_name]
-            current_queue['queue'].join()
-            self.__signal_queue_exit(current_queue['queue'], current_queue['process_count'])
-            self.__join_processes(procesess)
+        return self
+
+    def stats(self) -> Union[PipelineStats, None]:
+        """
+        Reads the counters of every stage: items in and out, throughput, time spent running the worker function,
+        waiting for items and putting results, the share of time the workers were idle, the peak queue depth
+        (sampled every monitor_interval seconds) and a histogram of the worker function latency.
+
+        While the automator is started the stats cover everything since start(), afterwards the stats
+        of the last run are kept until the next one starts.
+
+        Returns:
+            Union[PipelineStats, None]: The stats or None when the automator never ran
+        """
+
+        if self.__manager is None:
+            return self.__last_stats
+
+        workers = {queue_name: self.__active_processes(queue_name, process_list) for queue_name, process_list in self.__process_per_queue}
+        workers.update({queue_name: workers.get(head, 0) for queue_name, head in self.__fused_into.items()})
+        return PipelineStats.from_snapshots(
+            perf_counter() - self.__started_at,
+            {queue_name: queue_data['counters'].snapshot() for queue_name, queue_data in self.__queue_table.items() if 'counters' in queue_data},
+            workers,
+            self.__peak_depths
+        )
+
+    def submit(self, data: Iterable, queue: str = QueueNames.INPUT, ordered: bool = False, window: Union[int, None] = None) -> Job:
+        """
+        Sends data to a started automator, the data is read lazily in a feeder thread.
+
+        Args:
+            data (Iterable): The items to process
+            queue (str, optional): The queue that receives the items. Defaults to 'input'.
+            ordered (bool, optional): Deliver the results in the same order as the data. Defaults to False.
+            window (Union[int, None], optional): With ordered, max amount of items in flight past the oldest
+                                                 unfinished one, which bounds the reorder buffer. Defaults to None.
+
+        Raises:
+            RuntimeError: If the automator is not started or the queue does not exist
+
+        Returns:
+            Job: A handle to iterate over the results of this data or wait for them
+        """
+
+        if queue == QueueNames.OUTPUT or queue not in self.__queue_table:
+            raise RuntimeError(f'trying to submit data to {queue}, which is not the input queue of a worker function')
+
+        return self.__submit({queue: data}, ordered=ordered, window=window)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Stops the workers started with start().
+
+        Args:
+            wait (bool, optional): Wait for the submitted jobs to finish, otherwise the workers are terminated
+                                   and the pending jobs are aborted. Defaults to True.
+        """
 
-        return self.__recover_from_queue(self.__queue_table[QueueNames.OUTPUT]['queue'], True)
+        if self.__manager is None:
+            return
+
+        if not wait:
+            self.__stop_monitor_thread()
+
+        try:
+            if wait:
+                # the monitor keeps replacing the workers that crash while the queues drain, but stops autoscaling
+                self.__draining.set()
+                for job in list(self.__jobs.values()):
+                    job._join_feeders()
+
+                for queue_name, procesess in self.__process_per_queue:
+                    current_queue = self.__queue_table[queue_name]
+                    current_queue['queue'].join()
+                    self.__signal_queue_exit(current_queue['queue'], self.__active_processes(queue_name, procesess))
+                    self.__join_processes(list(procesess))
+
+                self.__stop_monitor_thread()
+                for _, procesess in self.__process_per_queue:
+                    self.__join_processes(procesess)
+
+                if self.__collector is not None:
+                    self.__queue_table[QueueNames.OUTPUT]['queue'].put(QueueFlags.EXIT)
+                    self.__collector.join()
+            else:
+                for _, procesess in self.__process_per_queue:
+                    # thread workers cannot be killed, they are daemons and die with this process
+                    procesess = [process for process in procesess if isinstance(process, Process)]
+                    for process in procesess:
+                        process.terminate()
+                    self.__join_processes(procesess)
+        finally:
+            self.__stop_monitor_thread()
+            self.__draining.clear()
+            self.__in_flight = {}
+            self.__last_stats = self.stats()
+            self.__report_stats()
+
+            for job in list(self.__jobs.values()):
+                job._abort()
+
+            for queue_data in self.__queue_table.values():
+                queue_data.pop('queue', None)
+                queue_data.pop('counters', None)
+
+            if self.shared_memory_threshold is not None and cleanup(self.__shm_prefix):
+                logger.debug(f'Unlinked the shared memory blocks left by {self}')
+
+            self.__manager.shutdown()
+            self.__manager = None
+            self.__process_per_queue = ()
+            self.__collector = None
+            self.__jobs = {}
+            self.__retiring = {}
+
+    def __enter__(self) -> 'QueueAutomator':
+        return self.start()
+
+    def __exit__(self, exc_type: Any, exc_value: Any, traceback: Any) -> None:
+        self.shutdown(wait=exc_type is None)
+
+    def run_iter(self, maxsize: int = DEFAULT_MAXSIZE, ordered: bool = False, window: Union[int, None] = None) -> Iterator[Any]:
+        """
+        Executes the pipeline and yields the results as soon as the last worker function produces them.
+
+        The input data is read lazily by feeder threads and every queue holds at most maxsize messages,
+        when a stage falls behind the stages before it block, so memory stays flat for any input size.
+
+        If the automator was started with start() the warm workers are reused,
+        otherwise they are spawned for this run and stopped when it ends.
+
+        With ordered=True every item gets a sequence number when it is enqueued and the results are
+        yielded in that order. When data was set for several queues, that is the order in which the items
+        entered the pipeline.
+
+        Args:
+            maxsize (int, optional): Max amount of messages per queue, 0 means unbounded. Defaults to 1000.
+            ordered (bool, optional): Yield the results in input order. Defaults to False.
+            window (Union[int, None], optional): With ordered, max amount of items in flight past the oldest
+                                                 unfinished one, which bounds the reorder buffer. Defaults to None.
+
+        Raises:
+            RuntimeError: If reading the input data failed
+
+        Yields:
+            Iterator[Any]: The results in the order they are produced
+        """
+
+        warm = self.__manager is not None
+        if not warm:
+            self.start(maxsize)
+
+        job = None
+        finished = False
+
+        try:
+            sources = {
+                queue_name: queue_data['data'] for queue_name, queue_data in self.__queue_table.items()
+                if queue_name != QueueNames.OUTPUT and queue_data['data'] is not None
+            }
+            job = self.__submit(sources, maxsize, ordered, window)
+            yield from job
+            finished = True
+        finally:
+            if job is not None:
+                self.dead_letters = job.failures
+            if job is not None and not finished:
+                job.cancel()
+            if not warm:
+                self.shutdown(wait=finished)
+
+    def run(self, ordered: bool = False) -> list:
+        """
+        Is the main entry point to execute your program
+        with a multiprocessing queue pipeline.
+
+        To use it you need to register at least 1 worker function
+
+        Do not forget to call set_input_data(Iterable) before calling run()
+
+        Items whose worker function raised are left out of the output,
+        they are kept in dead_letters as Failure instances until the next run.
+
+        Args:
+            ordered (bool, optional): Return the results in input order. Defaults to False.
+
+        Returns:
+            list: The output as a simple python list
+        """
+        return list(self.run_iter(0, ordered))
 
     def reset(self) -> None:
         self.__queue_table = {
@@ -232,6 +1076,7 @@ class QueueAutomator:
                 'target': None,
                 'process_count': None,
                 'worker_function': None,
-                'data': None
+                'data': None,
+                'options': {}
             }
         }
@@ -0,0 +1,85 @@
+from typing import Dict, Tuple
+
+HIGH_UTILIZATION = 0.8
+LOW_UTILIZATION = 0.2
+
+
+class Autoscaler:
+    """
+    Autoscaler decides how many processes each autoscaled stage should run.
+
+    Every call to plan() compares the stage counters with the previous call.
+    A stage whose workers were busy most of the time and still has items waiting is a bottleneck,
+    it gets one more process while the core budget allows it, otherwise a process is moved to it from the least
+    busy autoscaled stage. A stage whose workers were mostly idle with an empty queue gives one process back.
+    """
+
+    def __init__(self, bounds: Dict[str, Tuple[int, int]], core_budget: int,
+                 high_utilization: float = HIGH_UTILIZATION, low_utilization: float = LOW_UTILIZATION) -> None:
+        self.bounds = bounds
+        self.core_budget = core_budget
+        self.high_utilization = high_utilization
+        self.low_utilization = low_utilization
+        self.__previous: Dict[str, Dict[str, float]] = {}
+
+    def __utilization(self, name: str, snapshot: Dict[str, float], workers: int, elapsed: float) -> Tuple[float, float]:
+        previous = self.__previous.get(name, {})
+        busy = snapshot['busy_time'] - previous.get('busy_time', 0.0)
+        items = snapshot['items_in'] - previous.get('items_in', 0.0)
+        utilization = busy / (elapsed * workers) if elapsed > 0 and workers else 0.0
+        service_time = busy / items if items else 0.0
+        return utilization, service_time
+
+    def plan(self, snapshots: Dict[str, Dict[str, float]], depths: Dict[str, int],
+             workers: Dict[str, int], total_processes: int, elapsed: float) -> Dict[str, int]:
+        """
+        Computes the change in processes for every autoscaled stage
+
+        Args:
+            snapshots (Dict[str, Dict[str, float]]): The StageCounters snapshot of each autoscaled stage
+            depths (Dict[str, int]): The amount of messages waiting in the queue of each autoscaled stage
+            workers (Dict[str, int]): The amount of processes each autoscaled stage is running
+            total_processes (int): The amount of processes of all stages, autoscaled or not
+            elapsed (float): Seconds since the previous call
+
+        Returns:
+            Dict[str, int]: +1 or -1 for the stages that should grow or shrink
+        """
+
+        utilization: Dict[str, float] = {}
+        backlog: Dict[str, float] = {}
+        for name, snapshot in snapshots.items():
+            utilization[name], service_time = self.__utilization(name, snapshot, workers[name], elapsed)
+            backlog[name] = depths[name] * service_time / max(workers[name], 1)
+        self.__previous = snapshots
+
+        changes: Dict[str, int] = {}
+        for name in snapshots:
+            low, _ = self.bounds[name]
+            if utilization[name] <= self.low_utilization and depths[name] == 0 and workers[name] > low:
+                changes[name] = -1
+
+        bottlenecks = [
+            name for name in snapshots
+            if utilization[name] >= self.high_utilization and depths[name] > 0 and workers[name] < self.bounds[name][1]
+        ]
+        if not bottlenecks:
+            return changes
+
+        bottleneck = max(bottlenecks, key=lambda name: (backlog[name], depths[name]))
+        available = self.core_budget - total_processes - sum(changes.values())
+        if available > 0:
+            changes[bottleneck] = 1
+            return changes
+
+        donors = [
+            name for name in snapshots
+            if name != bottleneck and workers[name] + changes.get(name, 0) > self.bounds[name][0]
+            and utilization[name] < utilization[bottleneck]
+        ]
+        if donors:
+            donor = min(donors, key=lambda name: utilization[name])
+            changes[donor] = changes.get(donor, 0) - 1
+            changes[bottleneck] = 1
+
+        return changes
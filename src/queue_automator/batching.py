@@ -0,0 +1,94 @@
+from itertools import islice
+from queue import Empty
+from time import monotonic
+from typing import Any, Iterable, Iterator, List, Tuple, Union
+
+from .constants import QueueFlags
+
+
+class Batch(list):
+    """
+    A chunk of items that travels through a stage queue as a single message
+    """
+
+
+def is_exit(message: Any) -> bool:
+    return isinstance(message, str) and message == QueueFlags.EXIT
+
+
+def unpack(message: Any) -> list:
+    return message if isinstance(message, Batch) else [message]
+
+
+def repack(messages: List[Any], items: List[Any]) -> Any:
+    """
+    Packs the items produced from a group of messages into a single message for the next queue,
+    a lone item stays unwrapped so unbatched pipelines do not pay for the chunk.
+    """
+    return items[0] if len(messages) == 1 and not isinstance(messages[0], Batch) else Batch(items)
+
+
+def iter_batches(data: Iterable, batch_size: int) -> Iterator[Any]:
+    """
+    Splits data in chunks of batch_size items, when batch_size is 1 the items are yielded as they are
+
+    Args:
+        data (Iterable): The items to chunk
+        batch_size (int): The max amount of items per chunk
+
+    Yields:
+        Iterator[Any]: Batch instances or plain items
+    """
+    iterator = iter(data)
+    if batch_size <= 1:
+        yield from iterator
+        return
+
+    while True:
+        chunk = Batch(islice(iterator, batch_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def gather_messages(in_queue: Any, batch_size: int, max_batch_latency: Union[float, None] = None) -> Tuple[List[Any], bool]:
+    """
+    Blocks until a message arrives, then keeps taking messages until batch_size items are gathered.
+    Without max_batch_latency only the messages that are already waiting in the queue are taken,
+    otherwise it waits up to max_batch_latency seconds for the batch to fill.
+
+    Args:
+        in_queue (Any): The queue to read from
+        batch_size (int): The amount of items to gather
+        max_batch_latency (Union[float, None], optional): Max seconds to wait for a full batch. Defaults to None.
+
+    Returns:
+        Tuple[List[Any], bool]: The gathered messages and whether an EXIT flag was received
+    """
+    message = in_queue.get()
+    if is_exit(message):
+        return [], True
+
+    messages = [message]
+    count = len(unpack(message))
+    deadline = monotonic() + max_batch_latency if max_batch_latency else None
+
+    while count < batch_size:
+        try:
+            if deadline is None:
+                message = in_queue.get_nowait()
+            else:
+                remaining = deadline - monotonic()
+                if remaining <= 0:
+                    break
+                message = in_queue.get(timeout=remaining)
+        except Empty:
+            break
+
+        if is_exit(message):
+            return messages, True
+
+        messages.append(message)
+        count += len(unpack(message))
+
+    return messages, False
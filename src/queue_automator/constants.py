@@ -6,3 +6,19 @@ class QueueNames:
 
 class QueueFlags:
     EXIT: str = 'EXIT_QUEUE'
+
+
+class Transports:
+    MANAGER: str = 'manager'
+    PIPE: str = 'pipe'
+    SHM_RING: str = 'shm_ring'
+
+
+class Executors:
+    PROCESS: str = 'process'
+    THREAD: str = 'thread'
+    ASYNCIO: str = 'asyncio'
+
+
+class ProcessCounts:
+    AUTO: str = 'auto'
@@ -0,0 +1,189 @@
+from itertools import count
+from queue import Empty, Queue
+from threading import Event, Lock, Semaphore, Thread
+from typing import Any, Dict, Iterator, List, NamedTuple, Union
+
+_DONE = object()
+
+# Input items of a pipeline that fans out start with this weight so it can be split between the copies
+SPLITTABLE_WEIGHT = 1 << 60
+
+
+class Task(NamedTuple):
+    """
+    An item travelling through the stage queues, tagged with the job it belongs to
+    and its position in the input of that job. The weight of an input item is split between
+    the copies sent to several queues and added up again when a join combines them,
+    so a job is done once the weight of its delivered results matches the weight of its input.
+    """
+    job: int
+    payload: Any
+    seq: int = 0
+    weight: int = 1
+    source: Union[str, None] = None
+
+
+class Failure(NamedTuple):
+    """
+    A dead letter, the item a worker function could not process and why.
+    It travels through the rest of the pipeline in place of the result so the job still accounts for the item.
+    """
+    stage: str
+    item: Any
+    error: str
+    traceback: str = ''
+    attempts: int = 1
+
+
+def split_weight(weight: int, parts: int) -> List[int]:
+    """
+    Splits weight in parts integer shares that add up to weight exactly
+    """
+    share = weight // parts
+    return [share] * (parts - 1) + [weight - share * (parts - 1)]
+
+
+class Job:
+    """
+    Job is a handle to the data submitted to a started QueueAutomator.
+    It tracks how many items of the job are still inside the pipeline and
+    delivers the results that belong to it, so several jobs can share the same workers.
+
+    Iterate over it to get the results as they arrive or call result() to wait for all of them.
+    Items that failed are not part of the results, they are kept in failures as dead letters.
+    An ordered job holds early results in a reorder buffer and delivers them in input order,
+    a window caps how many items may be in flight past the oldest pending one.
+    When the pipeline fans out, every result produced from the same input item is delivered in its place.
+    """
+
+    def __init__(self, job_id: int, maxsize: int = 0, ordered: bool = False, window: Union[int, None] = None, weight: int = 1) -> None:
+        self.id = job_id
+        self.ordered = ordered
+        self.weight = weight
+        self.errors: List[Exception] = []
+        self.failures: List[Failure] = []
+        self.__failed: set = set()
+        self.cancelled = False
+        self.__results: Queue = Queue(maxsize)
+        self.__lock = Lock()
+        self.__pending = 0
+        self.__feeding = 1
+        self.__feeders: List[Thread] = []
+        self.__finished = Event()
+        self.__seqs = count()
+        self.__next_seq = 0
+        self.__reorder_buffer: Dict[int, list] = {}
+        self.__window = Semaphore(window) if ordered and window else None
+
+    def __repr__(self) -> str:
+        return f'Job[{self.id}]'
+
+    def __finish_if_done(self) -> None:
+        with self.__lock:
+            if self.__pending > 0 or self.__feeding or self.__finished.is_set():
+                return
+            self.__finished.set()
+        self.__results.put(_DONE)
+
+    def _add_feeder(self, feeder: Thread) -> None:
+        with self.__lock:
+            self.__feeding += 1
+        self.__feeders.append(feeder)
+
+    def _feeder_done(self) -> None:
+        with self.__lock:
+            self.__feeding -= 1
+        self.__finish_if_done()
+
+    def _join_feeders(self) -> None:
+        for feeder in self.__feeders:
+            feeder.join()
+
+    def _add_pending(self, count: int) -> None:
+        with self.__lock:
+            self.__pending += count
+
+    def _reserve_seq(self) -> int:
+        if self.__window is not None and not self.cancelled:
+            self.__window.acquire()
+        return next(self.__seqs)
+
+    def __release_in_order(self) -> None:
+        # a slot is complete once the results of its input item add up to the weight of that item
+        while self.__reorder_buffer.get(self.__next_seq, (0,))[0] == self.weight:
+            _, *payloads = self.__reorder_buffer.pop(self.__next_seq)
+            self.__next_seq += 1
+            if not self.cancelled:
+                for payload in payloads:
+                    self.__results.put(payload)
+            if self.__window is not None:
+                self.__window.release()
+
+    def __record_failure(self, failure: Failure, seq: int) -> None:
+        # a failure before a fan-out reaches the output once per branch, keep a single dead letter
+        if (seq, failure.stage) not in self.__failed:
+            self.__failed.add((seq, failure.stage))
+            self.failures.append(failure)
+
+    def _deliver(self, payload: Any, seq: int = 0, weight: int = 1) -> None:
+        failed = isinstance(payload, Failure)
+        if failed:
+            self.__record_failure(payload, seq)
+
+        if self.ordered:
+            slot = self.__reorder_buffer.setdefault(seq, [0])
+            slot[0] += weight
+            if not failed:
+                slot.append(payload)
+            self.__release_in_order()
+        elif not self.cancelled and not failed:
+            self.__results.put(payload)
+        with self.__lock:
+            self.__pending -= weight
+        self.__finish_if_done()
+
+    def _abort(self) -> None:
+        self.cancel()
+        with self.__lock:
+            self.__pending = self.__feeding = 0
+        self.__finish_if_done()
+
+    def cancel(self) -> None:
+        """
+        Stops feeding the remaining input data and drops the results that were not read yet
+        """
+        self.cancelled = True
+        self.__reorder_buffer.clear()
+        if self.__window is not None:
+            # wake up a feeder waiting for the window, it stops on the next item
+            self.__window.release()
+        try:
+            while True:
+                self.__results.get_nowait()
+        except Empty:
+            pass
+
+    def done(self) -> bool:
+        return self.__finished.is_set()
+
+    def wait(self, timeout: Union[float, None] = None) -> bool:
+        return self.__finished.wait(timeout)
+
+    def __iter__(self) -> Iterator[Any]:
+        while True:
+            result = self.__results.get()
+            if result is _DONE:
+                break
+            yield result
+
+        if self.errors:
+            raise RuntimeError(f'failed to read the input data of {self}') from self.errors[0]
+
+    def result(self) -> list:
+        """
+        Waits for the job to finish
+
+        Returns:
+            list: The results of the job as a simple python list
+        """
+        return list(self)
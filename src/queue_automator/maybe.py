@@ -1,10 +1,10 @@
 from functools import lru_cache
 from math import ceil
 from os import cpu_count
-from typing import Any, Callable, Iterable, List, Optional
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Union
 
-from .automator import QueueAutomator
-from .constants import QueueNames
+from .automator import DEFAULT_MAXSIZE, QueueAutomator
+from .constants import Executors, QueueNames
 
 
 class MaybeWrapper:
@@ -17,6 +17,25 @@ class MaybeWrapper:
     def maybe(self, value: Any) -> Any:
         return (value if self.default is None else self.default) if self.nothing_check(value) else self.func(value)
 
+    def maybe_many(self, values: list) -> list:
+        results = [value if self.default is None else self.default for value in values]
+        indexes = [index for index, value in enumerate(values) if not self.nothing_check(value)]
+        if indexes:
+            for index, result in zip(indexes, self.func([values[index] for index in indexes])):
+                results[index] = result
+        return results
+
+    async def maybe_async(self, value: Any) -> Any:
+        return (value if self.default is None else self.default) if self.nothing_check(value) else await self.func(value)
+
+    async def maybe_many_async(self, values: list) -> list:
+        results = [value if self.default is None else self.default for value in values]
+        indexes = [index for index, value in enumerate(values) if not self.nothing_check(value)]
+        if indexes:
+            for index, result in zip(indexes, await self.func([values[index] for index in indexes])):
+                results[index] = result
+        return results
+
 
 class MultiprocessMaybe:
     """
@@ -54,48 +73,93 @@ class MultiprocessMaybe:
         self.__inserted_data[last_stack_index] = data
         return self
 
-    def then(self, func: Callable, process_count: Optional[int] = None) -> 'MultiprocessMaybe':
+    def then(self, func: Callable, process_count: Optional[Union[int, str]] = None, batch_size: int = 1,
+             max_batch_latency: Optional[float] = None, vectorized: bool = False,
+             executor: str = Executors.PROCESS, concurrency: int = 1, fuse: bool = False) -> 'MultiprocessMaybe':
         """Use this method to chain worker functions
 
         Args:
             func (Callable): Any worker function that can process data 
-            process_count (Optional[int], optional): The number of workers you want to assign to this function. Defaults to None.
+            process_count (Optional[Union[int, str]], optional): The number of workers you want to assign to this function,
+                                                                 'auto' lets the automator scale them. Defaults to None.
+            batch_size (int, optional): Max amount of items a worker takes at once. Defaults to 1.
+            max_batch_latency (Optional[float], optional): Seconds a worker may wait for a batch to fill. Defaults to None.
+            vectorized (bool, optional): Call func once per batch with a list of items. Defaults to False.
+            executor (str, optional): 'process', 'thread' or 'asyncio' (func must be async). Defaults to 'process'.
+            concurrency (int, optional): Threads or in flight coroutines for the 'thread' and 'asyncio' executors. Defaults to 1.
 
         Returns:
             MultiprocessMaybe: _description_
         """
-        self.__call_stack.append((MaybeWrapper(func, self._is_nothing).maybe, process_count))
+        wrapper = MaybeWrapper(func, self._is_nothing)
+        options = {'batch_size': batch_size, 'max_batch_latency': max_batch_latency, 'vectorized': vectorized,
+                   'executor': executor, 'concurrency': concurrency, 'fuse': fuse}
+        if executor == Executors.ASYNCIO:
+            frame_func = wrapper.maybe_many_async if vectorized else wrapper.maybe_async
+        else:
+            frame_func = wrapper.maybe_many if vectorized else wrapper.maybe
+        self.__call_stack.append((frame_func, process_count, options))
         return self
 
     def _default_maybe_exec(self, value: Any) -> Any:
         return value
 
-    def __exec_maybe(self) -> list:
+    def __register_call_stack(self) -> None:
         last_queue_name = QueueNames.INPUT
         for index, frame in enumerate(self.__call_stack):
             input_name = last_queue_name
             output_name = QueueNames.OUTPUT if index == len(self.__call_stack) - 1 else f'queue_{index}'
-            frame_func, process_count = frame
-            self.automator.register_as_worker_function(input_name, output_name, process_count or self.__balance_cores())(frame_func)
+            frame_func, process_count, options = frame
+            self.automator.register_as_worker_function(input_name, output_name, process_count or self.__balance_cores(), **options)(frame_func)
             data = self.__inserted_data.get(index)
             if data:
                 self.automator.set_data_for_queue(data, input_name)
             last_queue_name = output_name
 
-        result = self.automator.run()
+    def __exec_maybe(self, ordered: bool) -> list:
+        self.__register_call_stack()
+        result = self.automator.run(ordered)
         self.automator.reset()
         return result
 
-    def maybe(self, func: Optional[Callable] = None, default: Any = None, process_count: Optional[int] = None) -> list:
+    def __stream_maybe(self, maxsize: int, ordered: bool, window: Optional[int]) -> Iterator[Any]:
+        self.__register_call_stack()
+        try:
+            yield from self.automator.run_iter(maxsize, ordered, window)
+        finally:
+            self.automator.reset()
+
+    def maybe(self, func: Optional[Callable] = None, default: Any = None, process_count: Optional[int] = None,
+              ordered: bool = False) -> list:
         """Use this method to execute the pipeline
 
         Args:
             func (Optional[Callable], optional): The lasst worker function, If you need one. Defaults to None.
             default (Any, optional): The default value you want when any of your worker function returns None. Defaults to None.
             process_count (Optional[int], optional): The number of workers you want to assign. Defaults to None.
+            ordered (bool, optional): Return the results in the order the data was inserted. Defaults to False.
 
         Returns:
             list: _description_
         """
-        self.__call_stack.append((MaybeWrapper(func or self._default_maybe_exec, self._is_nothing, default).maybe, process_count))
-        return self.__exec_maybe()
+        self.__call_stack.append((MaybeWrapper(func or self._default_maybe_exec, self._is_nothing, default).maybe, process_count, {}))
+        return self.__exec_maybe(ordered)
+
+    def stream(self, func: Optional[Callable] = None, default: Any = None, process_count: Optional[int] = None,
+               maxsize: int = DEFAULT_MAXSIZE, ordered: bool = False, window: Optional[int] = None) -> Iterator[Any]:
+        """Use this method to execute the pipeline and get the results as they are produced.
+            Inserted data is read lazily and every queue holds at most maxsize messages.
+
+        Args:
+            func (Optional[Callable], optional): The last worker function, If you need one. Defaults to None.
+            default (Any, optional): The default value you want when any of your worker function returns None. Defaults to None.
+            process_count (Optional[int], optional): The number of workers you want to assign. Defaults to None.
+            maxsize (int, optional): Max amount of messages per queue, 0 means unbounded. Defaults to 1000.
+            ordered (bool, optional): Yield the results in the order the data was inserted. Defaults to False.
+            window (Optional[int], optional): With ordered, max amount of items buffered ahead of the next result. Defaults to None.
+
+        Returns:
+            Iterator[Any]: A generator over the results
+        """
+        self.__call_stack.append((MaybeWrapper(func or self._default_maybe_exec, self._is_nothing, default).maybe, process_count, {}))
+        return self.__stream_maybe(maxsize, ordered, window)
@@ -0,0 +1,160 @@
+import os
+from itertools import count
+from multiprocessing.shared_memory import SharedMemory
+from threading import Lock
+from typing import Any, List, NamedTuple, Tuple, Union
+
+SHM_DIRECTORY = '/dev/shm'
+
+_block_ids = count()
+_lingering: List[SharedMemory] = []
+_lingering_lock = Lock()
+
+
+class SharedPayload(NamedTuple):
+    """
+    A handle to a payload that was copied to a shared memory block,
+    it travels through the stage queues instead of the payload itself
+    """
+    name: str
+    kind: str
+    size: int
+    shape: Any = None
+    dtype: Any = None
+
+
+def _is_ndarray(value: Any) -> bool:
+    return hasattr(value, '__array_interface__') and hasattr(value, 'dtype') and not value.dtype.hasobject
+
+
+def _payload_size(value: Any) -> int:
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, memoryview) or _is_ndarray(value):
+        return value.nbytes
+    return 0
+
+
+def share(value: Any, sharing: Union[Tuple[str, int], None]) -> Any:
+    """
+    Copies bytes, bytearray, memoryview and numpy array payloads of at least threshold bytes
+    to a new shared memory block, the block belongs to whoever resolves the returned handle.
+
+    Args:
+        value (Any): The payload
+        sharing (Union[Tuple[str, int], None]): The prefix of the block names and the threshold in bytes, None disables sharing
+
+    Returns:
+        Any: A SharedPayload or the value as it was
+    """
+    if sharing is None:
+        return value
+
+    prefix, threshold = sharing
+    size = _payload_size(value)
+    if not size or size < threshold:
+        return value
+
+    shm = SharedMemory(name=f'{prefix}_{os.getpid()}_{next(_block_ids)}', create=True, size=size)
+    try:
+        if _is_ndarray(value):
+            import numpy
+            numpy.ndarray(value.shape, value.dtype, buffer=shm.buf)[...] = value
+            return SharedPayload(shm.name, 'ndarray', size, value.shape, value.dtype)
+
+        if isinstance(value, memoryview):
+            shm.buf[:size] = value.cast('B') if value.c_contiguous else value.tobytes()
+            return SharedPayload(shm.name, 'memoryview', size, value.shape, value.format)
+
+        shm.buf[:size] = value
+        return SharedPayload(shm.name, type(value).__name__, size)
+    except Exception:
+        shm.unlink()
+        raise
+    finally:
+        shm.close()
+
+
+def resolve(value: Any, blocks: List[SharedMemory], copy: bool = False) -> Any:
+    """
+    Turns a SharedPayload back into its payload. numpy arrays and memoryviews are views over the block
+    unless copy is set, bytes and bytearray are always copied out of it.
+    The attached block is appended to blocks, call release() with them once the payloads are no longer used.
+
+    Args:
+        value (Any): A SharedPayload or any other payload
+        blocks (List[SharedMemory]): Collects the attached blocks
+        copy (bool, optional): Return a payload that does not depend on the block. Defaults to False.
+
+    Returns:
+        Any: The payload
+    """
+    if not isinstance(value, SharedPayload):
+        return value
+
+    shm = SharedMemory(name=value.name)
+    blocks.append(shm)
+
+    if value.kind == 'ndarray':
+        import numpy
+        array = numpy.ndarray(value.shape, value.dtype, buffer=shm.buf)
+        return array.copy() if copy else array
+
+    if value.kind == 'memoryview':
+        view = shm.buf[:value.size]
+        if copy:
+            view = memoryview(bytes(view))
+        return view.cast(value.dtype, value.shape) if value.shape else view
+
+    data = bytes(shm.buf[:value.size])
+    return bytearray(data) if value.kind == 'bytearray' else data
+
+
+def release(blocks: List[SharedMemory]) -> None:
+    """
+    Unlinks the blocks that were resolved by the last consumer of their payloads.
+    A block whose memory is still referenced by a view stays mapped until the next release call.
+    """
+    with _lingering_lock:
+        pending = _lingering + blocks
+        _lingering.clear()
+
+    for shm in blocks:
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+    for shm in pending:
+        try:
+            shm.close()
+        except BufferError:
+            with _lingering_lock:
+                _lingering.append(shm)
+    blocks.clear()
+
+
+def cleanup(prefix: str) -> int:
+    """
+    Unlinks the blocks of an automator that were never released, for example after a shutdown(wait=False).
+    Only works where shared memory blocks are visible in /dev/shm, elsewhere the resource tracker
+    of multiprocessing unlinks them when the program exits.
+
+    Returns:
+        int: The amount of unlinked blocks
+    """
+    if not os.path.isdir(SHM_DIRECTORY):
+        return 0
+
+    unlinked = 0
+    for name in os.listdir(SHM_DIRECTORY):
+        if not name.startswith(f'{prefix}_'):
+            continue
+        try:
+            shm = SharedMemory(name=name)
+        except FileNotFoundError:
+            continue
+        shm.close()
+        shm.unlink()
+        unlinked += 1
+    return unlinked
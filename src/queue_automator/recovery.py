@@ -0,0 +1,61 @@
+import traceback
+from multiprocessing import get_context
+from multiprocessing.context import BaseContext
+from time import sleep
+from typing import Any, Callable, List, Tuple, Union
+
+from .jobs import Failure, Task
+
+
+class InFlight:
+    """
+    The tasks a process worker took from its queue and did not finish yet, kept in shared memory
+    so the supervisor can fail them and mark them as done if the process dies.
+    Only the worker writes to it and the supervisor only reads it once the worker is dead, so it needs no lock.
+    """
+
+    def __init__(self, capacity: int, ctx: Union[BaseContext, None] = None) -> None:
+        self._capacity = capacity
+        self._values = (ctx or get_context()).RawArray('q', 2 + 3 * capacity)
+
+    def record(self, messages: int, tasks: List[Task]) -> None:
+        values = self._values
+        for index, task in enumerate(tasks[:self._capacity]):
+            values[2 + 3 * index:5 + 3 * index] = (task.job, task.seq, task.weight)
+        values[1] = min(len(tasks), self._capacity)
+        values[0] = messages
+
+    def clear(self) -> None:
+        self._values[0] = self._values[1] = 0
+
+    def lost(self) -> Tuple[int, List[Task]]:
+        """
+        Returns:
+            Tuple[int, List[Task]]: The amount of messages that were never marked as done and their tasks without payload
+        """
+        values = self._values
+        tasks = [Task(values[2 + 3 * index], None, values[3 + 3 * index], values[4 + 3 * index]) for index in range(values[1])]
+        return values[0], tasks
+
+
+def describe_error(stage: Union[str, None], item: Any, error: BaseException, attempts: int) -> Failure:
+    # memoryviews over shared memory cannot be pickled, keep a copy of their bytes instead
+    item = item.tobytes() if isinstance(item, memoryview) else item
+    return Failure(stage or '', item, repr(error), ''.join(traceback.format_exception(type(error), error, error.__traceback__)), attempts)
+
+
+def call_with_retries(function: Callable, payload: Any, retries: int, backoff: float, stage: Union[str, None]) -> Any:
+    """
+    Calls function with payload and retries it when it raises, waiting backoff seconds
+    before the first retry and twice as long before each one after it.
+
+    Returns:
+        Any: The result or a Failure once every attempt raised
+    """
+    for attempt in range(retries + 1):
+        try:
+            return function(payload)
+        except Exception as error:
+            if attempt == retries:
+                return describe_error(stage, payload, error, attempt + 1)
+            sleep(backoff * 2 ** attempt)
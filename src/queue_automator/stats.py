@@ -0,0 +1,134 @@
+from multiprocessing import get_context
+from multiprocessing.context import BaseContext
+from typing import Dict, Iterable, NamedTuple, Tuple, Union
+
+LATENCY_BUCKETS = 32
+
+
+def latency_bucket(seconds: float) -> int:
+    """
+    Bucket i of the latency histogram counts the calls that took less than 2**i microseconds
+    """
+    return min(int(seconds * 1e6).bit_length(), LATENCY_BUCKETS - 1)
+
+
+class StageCounters:
+    """
+    Counters of a stage kept in shared memory. Every worker of the stage adds to them
+    after each round of work, so the driver can read them at any time without talking to the workers.
+    """
+
+    FIELDS = ('items_in', 'items_out', 'busy_time', 'get_time', 'put_time')
+
+    def __init__(self, ctx: Union[BaseContext, None] = None) -> None:
+        self._values = (ctx or get_context()).Array('d', len(self.FIELDS) + LATENCY_BUCKETS)
+
+    def add(self, items_in: int, items_out: int, busy_time: float, get_time: float = 0.0, put_time: float = 0.0,
+            latencies: Iterable[float] = ()) -> None:
+        buckets: Dict[int, int] = {}
+        for latency in latencies:
+            bucket = len(self.FIELDS) + latency_bucket(latency)
+            buckets[bucket] = buckets.get(bucket, 0) + 1
+
+        values = self._values
+        with values.get_lock():
+            values[0] += items_in
+            values[1] += items_out
+            values[2] += busy_time
+            values[3] += get_time
+            values[4] += put_time
+            for bucket, amount in buckets.items():
+                values[bucket] += amount
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._values.get_lock():
+            values = self._values[:]
+        snapshot: dict = dict(zip(self.FIELDS, values))
+        snapshot['latency_histogram'] = tuple(int(value) for value in values[len(self.FIELDS):])
+        return snapshot
+
+
+class StageStats(NamedTuple):
+    """
+    What the workers of a stage did since the automator was started.
+    Times are the sum over every worker of the stage, in seconds.
+    """
+    name: str
+    workers: int
+    items_in: int
+    items_out: int
+    throughput: float
+    busy_time: float
+    get_time: float
+    put_time: float
+    idle_ratio: float
+    peak_queue_depth: int
+    latency_histogram: Tuple[int, ...]
+
+    def latency_percentile(self, percentile: float) -> float:
+        """
+        Upper bound of the worker function latency for the given percentile, read from the histogram
+
+        Args:
+            percentile (float): A number between 0 and 100
+
+        Returns:
+            float: The latency in seconds, 0 when nothing was processed yet
+        """
+        total = sum(self.latency_histogram)
+        if not total:
+            return 0.0
+
+        seen = 0
+        for bucket, amount in enumerate(self.latency_histogram):
+            seen += amount
+            if seen >= total * percentile / 100:
+                return 2 ** bucket / 1e6
+        return 2 ** (LATENCY_BUCKETS - 1) / 1e6
+
+
+class PipelineStats:
+    """
+    PipelineStats is a snapshot of the counters of every stage of a QueueAutomator
+    """
+
+    def __init__(self, elapsed: float, stages: Dict[str, StageStats]) -> None:
+        self.elapsed = elapsed
+        self.stages = stages
+
+    def __repr__(self) -> str:
+        return f'PipelineStats[{self.elapsed:0.2f}s, {", ".join(self.stages)}]'
+
+    def __getitem__(self, name: str) -> StageStats:
+        return self.stages[name]
+
+    def __iter__(self) -> Iterable[StageStats]:  # type: ignore
+        return iter(self.stages.values())
+
+    def bottleneck(self) -> Union[StageStats, None]:
+        """
+        The stage whose workers spent the largest share of their time running the worker function,
+        which is the one that benefits the most from a larger process_count
+        """
+        return min(self.stages.values(), key=lambda stage: stage.idle_ratio, default=None)
+
+    @classmethod
+    def from_snapshots(cls, elapsed: float, snapshots: Dict[str, Dict[str, float]],
+                       workers: Dict[str, int], peak_depths: Dict[str, int]) -> 'PipelineStats':
+        stages = {}
+        for name, snapshot in snapshots.items():
+            total_time = snapshot['busy_time'] + snapshot['get_time'] + snapshot['put_time']
+            stages[name] = StageStats(
+                name=name,
+                workers=workers.get(name, 0),
+                items_in=int(snapshot['items_in']),
+                items_out=int(snapshot['items_out']),
+                throughput=snapshot['items_out'] / elapsed if elapsed > 0 else 0.0,
+                busy_time=snapshot['busy_time'],
+                get_time=snapshot['get_time'],
+                put_time=snapshot['put_time'],
+                idle_ratio=snapshot['get_time'] / total_time if total_time > 0 else 1.0,
+                peak_queue_depth=peak_depths.get(name, 0),
+                latency_histogram=snapshot['latency_histogram']  # type: ignore
+            )
+        return cls(elapsed, stages)
@@ -0,0 +1,194 @@
+import pickle
+import struct
+from multiprocessing import Manager, get_context
+from multiprocessing.context import BaseContext
+from multiprocessing.shared_memory import SharedMemory
+from queue import Empty, Full
+from typing import Any, List, Union
+
+from .constants import Transports
+
+DEFAULT_RING_CAPACITY = 4 * 1024 * 1024
+
+_HEADER = struct.Struct('<I')
+_HEAD, _USED, _COUNT, _UNFINISHED = range(4)
+
+
+class ShmRingQueue:
+    """
+    A JoinableQueue compatible queue backed by a shared memory ring buffer.
+
+    Items are pickled straight into a fixed size byte ring guarded by a lock, so a put or a get
+    is a memory copy instead of a pipe write or a round trip to a manager process.
+    The queue can be passed to child processes as a Process argument.
+    """
+
+    def __init__(self, maxsize: int = 0, capacity: int = DEFAULT_RING_CAPACITY, ctx: Union[BaseContext, None] = None) -> None:
+        ctx = ctx or get_context()
+        self._maxsize = maxsize
+        self._capacity = capacity
+        self._shm = SharedMemory(create=True, size=capacity)
+        self._state = ctx.RawArray('q', 4)
+        self._cond = ctx.Condition(ctx.Lock())
+
+    def __getstate__(self) -> tuple:
+        return (self._maxsize, self._capacity, self._shm, self._state, self._cond)
+
+    def __setstate__(self, state: tuple) -> None:
+        self._maxsize, self._capacity, self._shm, self._state, self._cond = state
+
+    def __write(self, offset: int, data: bytes) -> int:
+        buf = self._shm.buf
+        first = min(len(data), self._capacity - offset)
+        buf[offset:offset + first] = data[:first]
+        if first < len(data):
+            buf[0:len(data) - first] = data[first:]
+        return (offset + len(data)) % self._capacity
+
+    def __read(self, offset: int, size: int) -> bytes:
+        buf = self._shm.buf
+        first = min(size, self._capacity - offset)
+        data = bytes(buf[offset:offset + first])
+        if first < size:
+            data += bytes(buf[0:size - first])
+        return data
+
+    def __has_room(self, size: int) -> bool:
+        state = self._state
+        if self._maxsize > 0 and state[_COUNT] >= self._maxsize:
+            return False
+        return self._capacity - state[_USED] >= size
+
+    def put(self, obj: Any, block: bool = True, timeout: Union[float, None] = None) -> None:
+        data = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+        size = _HEADER.size + len(data)
+        if size > self._capacity:
+            raise ValueError(f'item of {size} bytes does not fit in a ring of {self._capacity} bytes, increase the ring capacity')
+
+        with self._cond:
+            if not self.__has_room(size):
+                if not block or not self._cond.wait_for(lambda: self.__has_room(size), timeout):
+                    raise Full
+            state = self._state
+            offset = (state[_HEAD] + state[_USED]) % self._capacity
+            offset = self.__write(offset, _HEADER.pack(len(data)))
+            self.__write(offset, data)
+            state[_USED] += size
+            state[_COUNT] += 1
+            state[_UNFINISHED] += 1
+            self._cond.notify_all()
+
+    def get(self, block: bool = True, timeout: Union[float, None] = None) -> Any:
+        with self._cond:
+            if self._state[_COUNT] == 0:
+                if not block or not self._cond.wait_for(lambda: self._state[_COUNT] > 0, timeout):
+                    raise Empty
+            state = self._state
+            head = state[_HEAD]
+            (length,) = _HEADER.unpack(self.__read(head, _HEADER.size))
+            data = self.__read((head + _HEADER.size) % self._capacity, length)
+            state[_HEAD] = (head + _HEADER.size + length) % self._capacity
+            state[_USED] -= _HEADER.size + length
+            state[_COUNT] -= 1
+            self._cond.notify_all()
+        return pickle.loads(data)
+
+    def put_nowait(self, obj: Any) -> None:
+        self.put(obj, False)
+
+    def get_nowait(self) -> Any:
+        return self.get(False)
+
+    def task_done(self) -> None:
+        with self._cond:
+            if self._state[_UNFINISHED] <= 0:
+                raise ValueError('task_done() called too many times')
+            self._state[_UNFINISHED] -= 1
+            if self._state[_UNFINISHED] == 0:
+                self._cond.notify_all()
+
+    def join(self) -> None:
+        with self._cond:
+            self._cond.wait_for(lambda: self._state[_UNFINISHED] == 0)
+
+    def qsize(self) -> int:
+        return self._state[_COUNT]
+
+    def empty(self) -> bool:
+        return self.qsize() == 0
+
+    def close(self) -> None:
+        self._shm.close()
+
+    def unlink(self) -> None:
+        self._shm.close()
+        self._shm.unlink()
+
+
+class PipeTransport:
+    """
+    Creates plain multiprocessing queues, which move pickled items through OS pipes
+    without an intermediate manager process.
+    """
+
+    def __init__(self, ctx: Union[BaseContext, None] = None) -> None:
+        self.ctx = ctx or get_context()
+
+    def JoinableQueue(self, maxsize: int = 0) -> Any:
+        return self.ctx.JoinableQueue(maxsize)
+
+    def Queue(self, maxsize: int = 0) -> Any:
+        return self.ctx.Queue(maxsize)
+
+    def shutdown(self) -> None:
+        pass
+
+
+class ShmRingTransport:
+    """
+    Creates ShmRingQueue instances and releases their shared memory blocks on shutdown
+    """
+
+    def __init__(self, capacity: int = DEFAULT_RING_CAPACITY, ctx: Union[BaseContext, None] = None) -> None:
+        self.ctx = ctx or get_context()
+        self.capacity = capacity
+        self.__queues: List[ShmRingQueue] = []
+
+    def __create(self, maxsize: int) -> ShmRingQueue:
+        queue = ShmRingQueue(maxsize, self.capacity, self.ctx)
+        self.__queues.append(queue)
+        return queue
+
+    def JoinableQueue(self, maxsize: int = 0) -> ShmRingQueue:
+        return self.__create(maxsize)
+
+    def Queue(self, maxsize: int = 0) -> ShmRingQueue:
+        return self.__create(maxsize)
+
+    def shutdown(self) -> None:
+        for queue in self.__queues:
+            queue.unlink()
+        self.__queues.clear()
+
+
+def create_transport(transport: str) -> Any:
+    """
+    Builds the queue factory for a transport name.
+    Every factory exposes JoinableQueue(), Queue() and shutdown(), like SyncManager does.
+
+    Args:
+        transport (str): One of Transports.MANAGER, Transports.PIPE or Transports.SHM_RING
+
+    Raises:
+        ValueError: If the transport name is unknown
+
+    Returns:
+        Any: The queue factory
+    """
+    if transport == Transports.MANAGER:
+        return Manager()
+    if transport == Transports.PIPE:
+        return PipeTransport()
+    if transport == Transports.SHM_RING:
+        return ShmRingTransport()
+    raise ValueError(f'{transport} is not a valid transport, use one of manager, pipe or shm_ring')
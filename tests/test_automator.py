@@ -1,9 +1,17 @@
+import asyncio
+import os
 from multiprocessing import Manager, Queue
-from typing import Any
+from multiprocessing import Queue as MPQueue
+from queue import Queue as LocalQueue
+from time import perf_counter, sleep
+from typing import Any, Iterator
 
 import pytest
 from src.queue_automator import QueueAutomator
-from src.queue_automator.constants import QueueFlags, QueueNames
+from src.queue_automator.batching import Batch
+from src.queue_automator.constants import Executors, QueueFlags, QueueNames, Transports
+from src.queue_automator.jobs import Task
+from src.queue_automator.transports import PipeTransport
 
 
 @pytest.mark.parametrize('name', [None, 'TestName'])
@@ -15,7 +23,8 @@ def test_constructor(name: str) -> None:
             'target': None,
             'process_count': None,
             'worker_function': None,
-            'data': None
+            'data': None,
+            'options': {}
         }
     }
     test_name = name or ''
@@ -49,7 +58,8 @@ def test_build_queue() -> None:
             'target': target,
             'process_count': process_count,
             'worker_function': worker_function,
-            'data': None
+            'data': None,
+            'options': {}
         }
     }
 
@@ -116,12 +126,12 @@ def test_process_enqueued_objects() -> None:
     out_queue = manager.Queue(0)
     automator = QueueAutomator()
 
-    in_queue.put('value')
+    in_queue.put(Task(0, 'value'))
     in_queue.put(QueueFlags.EXIT)
 
     automator._process_enqueued_objects(in_queue, out_queue, lambda x: x)
 
-    assert out_queue.get() == 'value'
+    assert out_queue.get() == Task(0, 'value')
     out_queue.task_done()
 
 
@@ -159,12 +169,580 @@ def test_reset() -> None:
     assert QueueNames.OUTPUT in automator._QueueAutomator__queue_table
 
 
-@pytest.mark.parametrize('queue,has_manager', ((Manager().Queue(), True), (Manager().Queue(), False)))
-def test_recover_from_queue(queue: Queue, has_manager: bool) -> None:
+@pytest.mark.parametrize('queue', (Manager().Queue(), MPQueue()))
+def test_iter_results(queue: Queue) -> None:
     automator = QueueAutomator()
     data = list(range(10))
     for item in data:
         queue.put(item)
-    result = automator._QueueAutomator__recover_from_queue(queue, has_manager)
-    assert isinstance(result, list)
-    assert data == result
+    queue.put(Batch([10, 11]))
+    queue.put(QueueFlags.EXIT)
+    result = list(automator._QueueAutomator__iter_results(queue))
+    assert data + [10, 11] == result
+
+
+def test_invalid_transport() -> None:
+    with pytest.raises(ValueError):
+        QueueAutomator(transport='invalid')
+
+
+def double(x: int) -> int: return x * 2
+
+
+@pytest.mark.parametrize('transport', (Transports.MANAGER, Transports.PIPE, Transports.SHM_RING))
+def test_run_with_transport(transport: str) -> None:
+    automator = QueueAutomator(transport=transport)
+    automator.register_as_worker_function(output_queue_name='double', process_count=2)(double)
+    automator.register_as_worker_function(input_queue_name='double', process_count=2)(double)
+    automator.set_input_data(range(500))
+
+    assert sorted(automator.run()) == [x * 4 for x in range(500)]
+
+
+def double_all(items: list) -> list: return [x * 2 for x in items]
+
+
+def test_process_enqueued_batches() -> None:
+    manager = Manager()
+
+    in_queue = manager.JoinableQueue()  # type: ignore
+    out_queue = manager.Queue(0)
+    automator = QueueAutomator()
+
+    in_queue.put(Batch([Task(0, 1), Task(1, 2)]))
+    in_queue.put(Task(0, 3))
+    in_queue.put(QueueFlags.EXIT)
+
+    automator._process_enqueued_objects(in_queue, out_queue, double_all, {'batch_size': 4, 'vectorized': True})
+
+    assert out_queue.get() == Batch([Task(0, 2), Task(1, 4), Task(0, 6)])
+
+
+@pytest.mark.parametrize('batch_size,max_batch_latency,vectorized', ((10, None, False), (7, 0.01, False), (16, None, True)))
+def test_run_with_batches(batch_size: int, max_batch_latency: float, vectorized: bool) -> None:
+    automator = QueueAutomator(transport=Transports.PIPE)
+    automator.register_as_worker_function(output_queue_name='double', process_count=2, batch_size=batch_size,
+                                          max_batch_latency=max_batch_latency, vectorized=vectorized)(double_all if vectorized else double)
+    automator.register_as_worker_function(input_queue_name='double', process_count=2)(double)
+    automator.set_input_data(range(500))
+
+    assert sorted(automator.run()) == [x * 4 for x in range(500)]
+
+
+def test_invalid_batch_size() -> None:
+    automator = QueueAutomator()
+    with pytest.raises(ValueError):
+        automator.register_as_worker_function(batch_size=0)
+
+
+def test_generate_bounded_queues() -> None:
+    automator = QueueAutomator()
+    automator.register_as_worker_function(output_queue_name='small')(mock_func)
+    automator.register_as_worker_function(input_queue_name='small', maxsize=1)(mock_func)
+
+    queues: list = []
+    automator._QueueAutomator__generate_queues(queues, PipeTransport(), QueueNames.INPUT, 5)
+    queue_table = automator._QueueAutomator__queue_table
+
+    assert queue_table[QueueNames.INPUT]['queue']._maxsize == 5
+    assert queue_table['small']['queue']._maxsize == 1
+    assert queue_table[QueueNames.OUTPUT]['queue']._maxsize == 5
+
+
+def lazy_input(produced: list) -> Iterator[int]:
+    for item in range(1000):
+        produced.append(item)
+        yield item
+
+
+@pytest.mark.parametrize('transport', (Transports.MANAGER, Transports.PIPE, Transports.SHM_RING))
+def test_run_iter_reads_input_lazily(transport: str) -> None:
+    automator = QueueAutomator(transport=transport)
+    automator.register_as_worker_function(process_count=2)(double)
+    produced: list = []
+    automator.set_input_data(lazy_input(produced))
+
+    results = automator.run_iter(maxsize=4)
+    first = next(results)
+
+    assert first in (0, 2)
+    assert len(produced) < 1000
+    assert sorted([first, *results]) == [x * 2 for x in range(1000)]
+    assert len(produced) == 1000
+
+
+def test_run_iter_can_stop_early() -> None:
+    automator = QueueAutomator(transport=Transports.PIPE)
+    automator.register_as_worker_function(process_count=2)(double)
+    automator.set_input_data(range(100000))
+
+    results = automator.run_iter(maxsize=4)
+    assert next(results) in (0, 2)
+    results.close()
+
+    assert 'queue' not in automator._QueueAutomator__queue_table[QueueNames.INPUT]
+
+
+def failing_input() -> Iterator[int]:
+    yield 1
+    raise KeyError('broken input')
+
+
+def test_run_iter_raises_input_errors() -> None:
+    automator = QueueAutomator(transport=Transports.PIPE)
+    automator.register_as_worker_function()(double)
+    automator.set_input_data(failing_input())
+
+    with pytest.raises(RuntimeError):
+        list(automator.run_iter())
+
+
+@pytest.mark.parametrize('transport', (Transports.MANAGER, Transports.PIPE))
+def test_warm_workers_are_reused(transport: str) -> None:
+    automator = QueueAutomator(transport=transport)
+    automator.register_as_worker_function(output_queue_name='double', process_count=2)(double)
+    automator.register_as_worker_function(input_queue_name='double')(double)
+
+    with automator:
+        processes = [process for _, procesess in automator._QueueAutomator__process_per_queue for process in procesess]
+        first = automator.submit(range(100))
+        second = automator.submit(range(100, 150))
+        third = automator.submit([5], queue='double')
+
+        assert sorted(second.result()) == [x * 4 for x in range(100, 150)]
+        assert sorted(first.result()) == [x * 4 for x in range(100)]
+        assert third.result() == [10]
+        assert first.done() and second.done() and third.done()
+
+        automator.set_input_data(range(3))
+        assert sorted(automator.run()) == [0, 4, 8]
+        assert all(process.is_alive() for process in processes)
+
+    assert not any(process.is_alive() for process in processes)
+    assert 'queue' not in automator._QueueAutomator__queue_table[QueueNames.INPUT]
+
+
+def test_submit_requires_start() -> None:
+    automator = QueueAutomator()
+    automator.register_as_worker_function()(double)
+
+    with pytest.raises(RuntimeError):
+        automator.submit(range(3))
+
+    with pytest.raises(RuntimeError):
+        automator.submit(range(3), queue=QueueNames.OUTPUT)
+
+
+def test_start_twice_is_invalid() -> None:
+    automator = QueueAutomator(transport=Transports.PIPE)
+    automator.register_as_worker_function()(double)
+
+    with automator:
+        with pytest.raises(RuntimeError):
+            automator.start()
+
+
+def test_empty_job_finishes() -> None:
+    automator = QueueAutomator(transport=Transports.PIPE)
+    automator.register_as_worker_function()(double)
+
+    with automator:
+        assert automator.submit([]).result() == []
+
+
+def slow_on_even(x: int) -> int:
+    if x % 2 == 0:
+        sleep(0.001)
+    return x
+
+
+@pytest.mark.parametrize('transport', (Transports.MANAGER, Transports.PIPE))
+def test_run_ordered(transport: str) -> None:
+    automator = QueueAutomator(transport=transport)
+    automator.register_as_worker_function(output_queue_name='slow', process_count=3, batch_size=3)(slow_on_even)
+    automator.register_as_worker_function(input_queue_name='slow', process_count=2)(double)
+    automator.set_input_data(range(200))
+
+    assert automator.run(ordered=True) == [x * 2 for x in range(200)]
+
+
+def test_run_iter_ordered_with_window() -> None:
+    automator = QueueAutomator(transport=Transports.PIPE)
+    automator.register_as_worker_function(process_count=3)(slow_on_even)
+    automator.set_input_data(range(200))
+
+    assert list(automator.run_iter(ordered=True, window=8)) == list(range(200))
+
+
+async def double_async(x: int) -> int:
+    await asyncio.sleep(0.01)
+    return x * 2
+
+
+def test_invalid_executor() -> None:
+    automator = QueueAutomator()
+    with pytest.raises(ValueError):
+        automator.register_as_worker_function(executor='invalid')
+    with pytest.raises(ValueError):
+        automator.register_as_worker_function(executor=Executors.THREAD, concurrency=0)
+    with pytest.raises(ValueError):
+        automator.register_as_worker_function(executor=Executors.ASYNCIO)(double)
+
+
+def test_generate_queues_between_thread_stages_are_local() -> None:
+    automator = QueueAutomator()
+    automator.register_as_worker_function(output_queue_name='threads', executor=Executors.THREAD)(double)
+    automator.register_as_worker_function(input_queue_name='threads', output_queue_name='process', executor=Executors.ASYNCIO)(double_async)
+    automator.register_as_worker_function(input_queue_name='process')(double)
+
+    queues: list = []
+    automator._QueueAutomator__generate_queues(queues, PipeTransport(), QueueNames.INPUT)
+    queue_table = automator._QueueAutomator__queue_table
+
+    assert isinstance(queue_table[QueueNames.INPUT]['queue'], LocalQueue)
+    assert isinstance(queue_table['threads']['queue'], LocalQueue)
+    assert not isinstance(queue_table['process']['queue'], LocalQueue)
+    assert not isinstance(queue_table[QueueNames.OUTPUT]['queue'], LocalQueue)
+
+
+def test_run_with_mixed_executors() -> None:
+    automator = QueueAutomator(transport=Transports.PIPE)
+    automator.register_as_worker_function(output_queue_name='threads', executor=Executors.THREAD, concurrency=4)(lambda x: x + 1)
+    automator.register_as_worker_function(input_queue_name='threads', output_queue_name='process', executor=Executors.ASYNCIO,
+                                          concurrency=50)(double_async)
+    automator.register_as_worker_function(input_queue_name='process', process_count=2)(double)
+    automator.set_input_data(range(200))
+
+    start = perf_counter()
+    assert automator.run(ordered=True) == [(x + 1) * 4 for x in range(200)]
+    assert perf_counter() - start < 1.5
+
+
+def test_run_async_stage_with_batches() -> None:
+    async def double_all_async(items: list) -> list:
+        return [x * 2 for x in items]
+
+    automator = QueueAutomator()
+    automator.register_as_worker_function(executor=Executors.ASYNCIO, batch_size=10, vectorized=True)(double_all_async)
+    automator.set_input_data(range(100))
+
+    assert sorted(automator.run()) == [x * 2 for x in range(100)]
+
+
+def sleep_and_double(x: int) -> int:
+    sleep(0.01)
+    return x * 2
+
+
+def test_invalid_autoscale() -> None:
+    automator = QueueAutomator()
+    with pytest.raises(ValueError):
+        automator.register_as_worker_function(process_count='auto', executor=Executors.THREAD)
+    with pytest.raises(ValueError):
+        automator.register_as_worker_function(process_count='auto', min_processes=3, max_processes=2)
+    with pytest.raises(ValueError):
+        automator.register_as_worker_function(process_count='many')
+
+
+def test_autoscale_grows_the_bottleneck() -> None:
+    automator = QueueAutomator(transport=Transports.PIPE, core_budget=4, monitor_interval=0.05)
+    automator.register_as_worker_function(output_queue_name='slow', process_count='auto', max_processes=1)(double)
+    automator.register_as_worker_function(input_queue_name='slow', process_count='auto', max_processes=3)(sleep_and_double)
+
+    with automator:
+        job = automator.submit(range(300))
+        process_per_queue = dict(automator._QueueAutomator__process_per_queue)
+        deadline = perf_counter() + 5
+        while len(process_per_queue['slow']) < 3 and perf_counter() < deadline:
+            sleep(0.05)
+
+        assert len(process_per_queue['slow']) == 3
+        assert len(process_per_queue[QueueNames.INPUT]) == 1
+        assert sorted(job.result()) == [x * 4 for x in range(300)]
+
+        deadline = perf_counter() + 5
+        while len(process_per_queue['slow']) > 1 and perf_counter() < deadline:
+            sleep(0.05)
+
+        assert len(process_per_queue['slow']) == 1
+        assert sorted(automator.submit(range(10)).result()) == [x * 4 for x in range(10)]
+
+
+def test_stats_are_reported() -> None:
+    reports: list = []
+    automator = QueueAutomator(transport=Transports.PIPE, monitor_interval=0.05, stats_callback=reports.append)
+    automator.register_as_worker_function(output_queue_name='slow', process_count=2)(double)
+    automator.register_as_worker_function(input_queue_name='slow')(sleep_and_double)
+    automator.set_input_data(range(30))
+
+    assert automator.stats() is None
+    automator.run()
+    stats = automator.stats()
+
+    assert stats is not None
+    assert stats[QueueNames.INPUT].items_in == 30
+    assert stats[QueueNames.INPUT].workers == 2
+    assert stats['slow'].items_out == 30
+    assert stats['slow'].busy_time >= 0.3
+    assert stats['slow'].peak_queue_depth > 0
+    assert sum(stats['slow'].latency_histogram) == 30
+    assert stats.bottleneck() == stats['slow']
+    assert len(reports) > 1
+    assert reports[-1] is not None
+
+
+def reverse(item: bytes) -> bytes:
+    return item[::-1]
+
+
+@pytest.mark.parametrize('transport', [Transports.MANAGER, Transports.PIPE, Transports.SHM_RING])
+def test_run_with_shared_memory_payloads(transport: str) -> None:
+    automator = QueueAutomator(transport=transport, shared_memory_threshold=1024)
+    automator.register_as_worker_function(output_queue_name='reversed', process_count=2)(reverse)
+    automator.register_as_worker_function(input_queue_name='reversed', executor=Executors.THREAD)(reverse)
+    payloads = [bytes([index]) * 4096 + b'end' for index in range(20)] + [b'small']
+    automator.set_input_data(payloads)
+
+    assert sorted(automator.run()) == sorted(payloads)
+    prefix = automator._QueueAutomator__shm_prefix  # type: ignore
+    assert not [name for name in os.listdir('/dev/shm') if name.startswith(f'{prefix}_')]
+
+
+def parity(item: int) -> str:
+    return 'even' if item % 2 == 0 else 'odd'
+
+
+def add_pieces(pieces: dict) -> int:
+    return pieces['incremented'] + pieces['doubled']
+
+
+def increment(item: int) -> int:
+    return item + 1
+
+
+@pytest.mark.parametrize('transport', [Transports.MANAGER, Transports.PIPE])
+def test_run_broadcast_to_several_branches(transport: str) -> None:
+    automator = QueueAutomator(transport=transport)
+    automator.register_as_worker_function(output_queue_name=['incremented', 'doubled'], process_count=2)(mock_func)
+    automator.register_as_worker_function(input_queue_name='incremented', process_count=2)(increment)
+    automator.register_as_worker_function(input_queue_name='doubled', executor=Executors.THREAD)(double)
+    automator.set_input_data(range(50))
+
+    assert sorted(automator.run()) == sorted([x + 1 for x in range(50)] + [x * 2 for x in range(50)])
+
+
+def test_run_routed_branches_merge_into_one_queue() -> None:
+    automator = QueueAutomator(transport=Transports.PIPE)
+    automator.register_as_worker_function(output_queue_name=['even', 'odd'], route=parity, batch_size=4)(mock_func)
+    automator.register_as_worker_function(input_queue_name='even', output_queue_name='merged')(double)
+    automator.register_as_worker_function(input_queue_name='odd', output_queue_name='merged')(increment)
+    automator.register_as_worker_function(input_queue_name='merged', process_count=2)(mock_func)
+    automator.set_input_data(range(40))
+
+    assert automator.run(ordered=True) == [x * 2 if x % 2 == 0 else x + 1 for x in range(40)]
+    stats = automator.stats()
+    assert stats is not None and stats['merged'].items_in == 40
+
+
+def test_run_join_combines_the_branches_of_each_item() -> None:
+    automator = QueueAutomator(transport=Transports.PIPE)
+    automator.register_as_worker_function(output_queue_name=['incremented', 'doubled'])(mock_func)
+    automator.register_as_worker_function(input_queue_name='incremented', output_queue_name='joined', process_count=2)(increment)
+    automator.register_as_worker_function(input_queue_name='doubled', output_queue_name='joined', process_count=2)(double)
+    automator.register_as_worker_function(input_queue_name='joined', join=True)(add_pieces)
+    automator.set_input_data(range(100))
+
+    assert automator.run(ordered=True) == [x + 1 + x * 2 for x in range(100)]
+
+
+def test_run_ordered_fan_out_keeps_the_results_of_an_item_together() -> None:
+    automator = QueueAutomator(transport=Transports.PIPE)
+    automator.register_as_worker_function(output_queue_name=['first', 'second'])(mock_func)
+    automator.register_as_worker_function(input_queue_name='first', process_count=2)(sleep_and_double)
+    automator.register_as_worker_function(input_queue_name='second', process_count=2)(double)
+    automator.set_input_data(range(10))
+
+    results = automator.run(ordered=True)
+    assert results == [x * 2 for x in range(10) for _ in range(2)]
+
+
+def test_invalid_dag_registrations() -> None:
+    automator = QueueAutomator()
+    with pytest.raises(ValueError):
+        automator.register_as_worker_function(output_queue_name=['a', 'a'])
+    with pytest.raises(ValueError):
+        automator.register_as_worker_function(output_queue_name=['a', 'b'], route='a')
+    with pytest.raises(ValueError):
+        automator.register_as_worker_function(input_queue_name='joined', join=True, process_count=2)
+    with pytest.raises(ValueError):
+        automator.register_as_worker_function(input_queue_name='joined', join=True, executor=Executors.ASYNCIO)
+
+
+def test_generate_queues_rejects_circular_pipelines() -> None:
+    automator = QueueAutomator()
+    automator.register_as_worker_function(output_queue_name=['loop', QueueNames.OUTPUT])(mock_func)
+    automator.register_as_worker_function(input_queue_name='loop', output_queue_name=QueueNames.INPUT)(mock_func)
+
+    with pytest.raises(RuntimeError):
+        automator._QueueAutomator__generate_queues([], PipeTransport(), QueueNames.INPUT)
+
+
+def test_generate_queues_in_topological_order() -> None:
+    automator = QueueAutomator()
+    automator.register_as_worker_function(output_queue_name=['a', 'b'])(mock_func)
+    automator.register_as_worker_function(input_queue_name='a', output_queue_name='c')(mock_func)
+    automator.register_as_worker_function(input_queue_name='b', output_queue_name=['c', QueueNames.OUTPUT], executor=Executors.THREAD)(mock_func)
+    automator.register_as_worker_function(input_queue_name='c', executor=Executors.THREAD)(mock_func)
+
+    queues: list = []
+    automator._QueueAutomator__generate_queues(queues, PipeTransport(), QueueNames.INPUT)
+    order = [name for name, _ in queues]
+    queue_table = automator._QueueAutomator__queue_table
+
+    assert order[0] == QueueNames.INPUT and order[-1] == 'c'
+    assert set(order) == {QueueNames.INPUT, 'a', 'b', 'c'}
+    # c is consumed by a thread but fed by the process stage a
+    assert not isinstance(queue_table['c']['queue'], LocalQueue)
+    # output is fed by the thread stages b and c only
+    assert isinstance(queue_table[QueueNames.OUTPUT]['queue'], LocalQueue)
+
+
+def test_run_with_fused_stages_keeps_their_stats() -> None:
+    automator = QueueAutomator(transport=Transports.PIPE)
+    automator.register_as_worker_function(output_queue_name='parsed', process_count=2)(increment)
+    automator.register_as_worker_function(input_queue_name='parsed', output_queue_name='normalized', fuse=True)(double)
+    automator.register_as_worker_function(input_queue_name='normalized', fuse=True, vectorized=True)(double_all)
+    automator.set_input_data(range(30))
+
+    assert sorted(automator.run()) == [(x + 1) * 4 for x in range(30)]
+    stats = automator.stats()
+    assert stats is not None
+    assert [stats[name].items_out for name in (QueueNames.INPUT, 'parsed', 'normalized')] == [30, 30, 30]
+    assert stats['normalized'].workers == 2
+    assert 'queue' not in automator._QueueAutomator__queue_table['parsed']
+
+
+def test_fused_stage_has_no_queue() -> None:
+    automator = QueueAutomator(transport=Transports.PIPE)
+    automator.register_as_worker_function(output_queue_name='parsed')(increment)
+    automator.register_as_worker_function(input_queue_name='parsed', fuse=True)(double)
+
+    with automator:
+        with pytest.raises(RuntimeError):
+            automator.submit(range(3), queue='parsed')
+        assert sorted(automator.submit(range(3)).result()) == [2, 4, 6]
+
+
+def test_stages_that_cannot_be_fused_keep_their_queue() -> None:
+    automator = QueueAutomator(transport=Transports.PIPE)
+    automator.register_as_worker_function(output_queue_name=['a', 'b'])(mock_func)
+    automator.register_as_worker_function(input_queue_name='a', fuse=True)(increment)
+    automator.register_as_worker_function(input_queue_name='b', fuse=True, executor=Executors.THREAD)(double)
+    automator.set_input_data(range(5))
+
+    assert sorted(automator.run()) == sorted([x + 1 for x in range(5)] + [x * 2 for x in range(5)])
+    assert automator._QueueAutomator__fused_into == {}
+
+
+def test_cheap_stages_are_fused_after_a_measured_run() -> None:
+    automator = QueueAutomator(transport=Transports.PIPE, fuse_threshold=0.01)
+    automator.register_as_worker_function(output_queue_name='cheap')(increment)
+    automator.register_as_worker_function(input_queue_name='cheap', output_queue_name='slow')(double)
+    automator.register_as_worker_function(input_queue_name='slow')(sleep_and_double)
+
+    automator.set_input_data(range(10))
+    first = automator.run()
+    assert automator._QueueAutomator__fused_into == {}
+
+    automator.set_input_data(range(10))
+    assert sorted(automator.run()) == sorted(first)
+    assert automator._QueueAutomator__fused_into == {'cheap': QueueNames.INPUT}
+
+
+def fail_on_three(x: int) -> int:
+    if x == 3:
+        raise ValueError('three')
+    return x
+
+
+def fail_on_three_all(items: list) -> list:
+    return [fail_on_three(x) for x in items]
+
+
+async def fail_on_three_async(x: int) -> int:
+    return fail_on_three(x)
+
+
+FLAKY_CALLS: set = set()
+
+
+def flaky(x: int) -> int:
+    if x not in FLAKY_CALLS:
+        FLAKY_CALLS.add(x)
+        raise ConnectionError(x)
+    return x
+
+
+def die_on_five(x: int) -> int:
+    if x == 5:
+        os._exit(1)
+    return x
+
+
+@pytest.mark.parametrize('options', [{}, {'batch_size': 4, 'vectorized': True}, {'executor': Executors.ASYNCIO}])
+def test_failed_items_become_dead_letters(options: dict) -> None:
+    function = fail_on_three_all if options.get('vectorized') else fail_on_three_async if options.get('executor') else fail_on_three
+    automator = QueueAutomator(transport=Transports.PIPE)
+    automator.register_as_worker_function(output_queue_name='checked', **options)(function)
+    automator.register_as_worker_function(input_queue_name='checked')(double)
+    automator.set_input_data(range(10))
+
+    assert automator.run(ordered=True) == [x * 2 for x in range(10) if x != 3]
+    assert len(automator.dead_letters) == 1
+    failure = automator.dead_letters[0]
+    assert failure.stage == QueueNames.INPUT
+    assert failure.item == 3
+    assert 'three' in failure.error and 'ValueError' in failure.traceback
+
+
+def test_failed_items_are_retried() -> None:
+    automator = QueueAutomator(transport=Transports.PIPE)
+    automator.register_as_worker_function(retries=2, retry_backoff=0.001)(flaky)
+    automator.set_input_data(range(5))
+
+    assert sorted(automator.run()) == list(range(5))
+    assert automator.dead_letters == []
+
+
+def test_failure_before_a_join_is_reported_once() -> None:
+    automator = QueueAutomator(transport=Transports.PIPE)
+    automator.register_as_worker_function(output_queue_name=['checked', 'doubled'])(mock_func)
+    automator.register_as_worker_function(input_queue_name='checked', output_queue_name='joined')(fail_on_three)
+    automator.register_as_worker_function(input_queue_name='doubled', output_queue_name='joined')(double)
+    automator.register_as_worker_function(input_queue_name='joined', join=True)(lambda pieces: pieces['checked'] + pieces['doubled'])
+    automator.set_input_data(range(6))
+
+    assert automator.run(ordered=True) == [x * 3 for x in range(6) if x != 3]
+    assert [failure.item for failure in automator.dead_letters] == [3]
+
+
+def test_crashed_workers_are_replaced() -> None:
+    automator = QueueAutomator(transport=Transports.PIPE, monitor_interval=0.05)
+    automator.register_as_worker_function(output_queue_name='fragile', process_count=2)(mock_func)
+    automator.register_as_worker_function(input_queue_name='fragile', process_count=2)(die_on_five)
+    automator.set_input_data(range(20))
+
+    with automator:
+        job = automator.submit(range(20))
+        assert sorted(job.result()) == [x for x in range(20) if x != 5]
+        assert [failure.item for failure in job.failures] == [None]
+        assert 'exit code 1' in job.failures[0].error
+        process_per_queue = dict(automator._QueueAutomator__process_per_queue)
+        assert len(process_per_queue['fragile']) == 2
+        assert sorted(automator.submit(range(4)).result()) == list(range(4))
+
+
+def test_invalid_retries() -> None:
+    automator = QueueAutomator()
+    with pytest.raises(ValueError):
+        automator.register_as_worker_function(retries=-1)
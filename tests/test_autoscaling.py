@@ -0,0 +1,51 @@
+from src.queue_automator.autoscaling import Autoscaler
+
+
+def snapshot(items: float, busy_time: float) -> dict:
+    return {'items_in': items, 'items_out': items, 'busy_time': busy_time}
+
+
+def test_bottleneck_gets_a_process_within_budget() -> None:
+    autoscaler = Autoscaler({'slow': (1, 4), 'fast': (1, 4)}, core_budget=4)
+    changes = autoscaler.plan(
+        {'slow': snapshot(10, 0.95), 'fast': snapshot(100, 0.5)},
+        {'slow': 50, 'fast': 0},
+        {'slow': 1, 'fast': 1},
+        total_processes=2,
+        elapsed=1.0
+    )
+    assert changes == {'slow': 1}
+
+
+def test_idle_stage_gives_back_a_process() -> None:
+    autoscaler = Autoscaler({'idle': (1, 4)}, core_budget=4)
+    changes = autoscaler.plan({'idle': snapshot(1, 0.01)}, {'idle': 0}, {'idle': 3}, total_processes=3, elapsed=1.0)
+    assert changes == {'idle': -1}
+
+    changes = autoscaler.plan({'idle': snapshot(1, 0.01)}, {'idle': 0}, {'idle': 1}, total_processes=1, elapsed=1.0)
+    assert changes == {}
+
+
+def test_budget_moves_processes_to_the_bottleneck() -> None:
+    autoscaler = Autoscaler({'slow': (1, 4), 'fast': (1, 4)}, core_budget=4)
+    changes = autoscaler.plan(
+        {'slow': snapshot(10, 1.9), 'fast': snapshot(100, 1.0)},
+        {'slow': 50, 'fast': 3},
+        {'slow': 2, 'fast': 2},
+        total_processes=4,
+        elapsed=1.0
+    )
+    assert changes == {'slow': 1, 'fast': -1}
+
+
+def test_max_processes_is_respected() -> None:
+    autoscaler = Autoscaler({'slow': (1, 2)}, core_budget=8)
+    changes = autoscaler.plan({'slow': snapshot(10, 2.0)}, {'slow': 50}, {'slow': 2}, total_processes=2, elapsed=1.0)
+    assert changes == {}
+
+
+def test_plan_uses_the_difference_with_the_previous_sample() -> None:
+    autoscaler = Autoscaler({'stage': (1, 4)}, core_budget=4)
+    autoscaler.plan({'stage': snapshot(100, 10.0)}, {'stage': 5}, {'stage': 1}, total_processes=1, elapsed=10.0)
+    changes = autoscaler.plan({'stage': snapshot(101, 10.01)}, {'stage': 0}, {'stage': 2}, total_processes=2, elapsed=1.0)
+    assert changes == {'stage': -1}
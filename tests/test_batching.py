@@ -0,0 +1,44 @@
+from queue import Queue
+
+from src.queue_automator.batching import Batch, gather_messages, is_exit, iter_batches, unpack
+from src.queue_automator.constants import QueueFlags
+
+
+def test_iter_batches() -> None:
+    assert list(iter_batches(range(5), 2)) == [Batch([0, 1]), Batch([2, 3]), Batch([4])]
+    assert list(iter_batches(range(3), 1)) == [0, 1, 2]
+
+
+def test_unpack() -> None:
+    assert unpack(Batch([1, 2])) == [1, 2]
+    assert unpack([1, 2]) == [[1, 2]]
+
+
+def test_is_exit() -> None:
+    assert is_exit(QueueFlags.EXIT)
+    assert not is_exit(Batch([QueueFlags.EXIT]))
+
+
+def test_gather_messages_takes_waiting_items() -> None:
+    queue: Queue = Queue()
+    for item in range(5):
+        queue.put(item)
+
+    messages, exiting = gather_messages(queue, 3)
+    assert messages == [0, 1, 2]
+    assert not exiting
+
+    messages, exiting = gather_messages(queue, 3, 0.01)
+    assert messages == [3, 4]
+    assert not exiting
+
+
+def test_gather_messages_stops_on_exit() -> None:
+    queue: Queue = Queue()
+    queue.put(Batch([1, 2]))
+    queue.put(QueueFlags.EXIT)
+
+    assert gather_messages(queue, 10) == ([Batch([1, 2])], True)
+
+    queue.put(QueueFlags.EXIT)
+    assert gather_messages(queue, 10) == ([], True)
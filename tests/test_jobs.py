@@ -0,0 +1,113 @@
+from threading import Thread
+
+import pytest
+from src.queue_automator.jobs import SPLITTABLE_WEIGHT, Failure, Job, split_weight
+
+
+def test_job_finishes_after_feeding_and_delivery() -> None:
+    job = Job(1)
+    feeder = Thread(target=lambda: None)
+    job._add_feeder(feeder)
+    job._feeder_done()
+    job._add_pending(2)
+    job._deliver('a')
+    assert not job.done()
+
+    job._feeder_done()
+    assert not job.done()
+
+    job._deliver('b')
+    assert job.done()
+    assert job.result() == ['a', 'b']
+
+
+def test_cancelled_job_drops_results() -> None:
+    job = Job(1, maxsize=1)
+    job._add_pending(2)
+    job._deliver('a')
+    job.cancel()
+    job._deliver('b')
+    job._feeder_done()
+
+    assert job.done()
+    assert job.result() == []
+
+
+def test_aborted_job_finishes() -> None:
+    job = Job(1)
+    job._add_pending(5)
+    job._abort()
+
+    assert job.wait(1)
+    assert job.result() == []
+
+
+def test_job_raises_feeding_errors() -> None:
+    job = Job(1)
+    job.errors.append(KeyError('broken'))
+    job._feeder_done()
+
+    with pytest.raises(RuntimeError):
+        job.result()
+
+
+def test_ordered_job_reorders_results() -> None:
+    job = Job(1, ordered=True, window=2)
+    seqs = [job._reserve_seq(), job._reserve_seq()]
+    job._add_pending(2)
+    job._deliver('second', seqs[1])
+    job._deliver('first', seqs[0])
+    job._feeder_done()
+
+    assert job.result() == ['first', 'second']
+
+
+def test_window_blocks_until_results_are_released() -> None:
+    job = Job(1, ordered=True, window=1)
+    job._add_pending(1)
+    seq = job._reserve_seq()
+    reserved: list = []
+
+    feeder = Thread(target=lambda: reserved.append(job._reserve_seq()), daemon=True)
+    feeder.start()
+    feeder.join(0.05)
+    assert reserved == []
+
+    job._deliver('first', seq)
+    feeder.join(1)
+    assert reserved == [1]
+
+
+def test_split_weight_adds_up() -> None:
+    assert split_weight(10, 3) == [3, 3, 4]
+    assert sum(split_weight(SPLITTABLE_WEIGHT, 7)) == SPLITTABLE_WEIGHT
+
+
+def test_ordered_job_waits_for_every_part_of_an_item() -> None:
+    job = Job(1, ordered=True, weight=4)
+    seqs = [job._reserve_seq(), job._reserve_seq()]
+    job._add_pending(8)
+    job._feeder_done()
+
+    job._deliver('second', seqs[1], 4)
+    job._deliver('first a', seqs[0], 1)
+    assert not job.done()
+    job._deliver('first b', seqs[0], 3)
+
+    assert job.done()
+    assert job.result() == ['first a', 'first b', 'second']
+
+
+def test_failures_are_kept_apart_from_the_results() -> None:
+    job = Job(1, ordered=True, weight=2)
+    seqs = [job._reserve_seq(), job._reserve_seq()]
+    job._add_pending(4)
+    job._feeder_done()
+
+    failure = Failure('stage', 'item', 'ValueError()')
+    job._deliver(failure, seqs[0], 1)
+    job._deliver(failure, seqs[0], 1)
+    job._deliver('second', seqs[1], 2)
+
+    assert job.result() == ['second']
+    assert job.failures == [failure]
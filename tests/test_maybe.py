@@ -0,0 +1,60 @@
+from src.queue_automator.maybe import MaybeWrapper, MultiprocessMaybe
+
+
+def add_one(x: int) -> int: return x + 1
+
+
+def add_one_all(items: list) -> list: return [x + 1 for x in items]
+
+
+def test_maybe_many() -> None:
+    wrapper = MaybeWrapper(add_one_all, lambda value: value is None, default=0)
+    assert wrapper.maybe_many([1, None, 3]) == [2, 0, 4]
+
+
+def test_maybe_with_batches() -> None:
+    result = MultiprocessMaybe() \
+        .insert(range(1, 50)) \
+        .then(add_one, process_count=2, batch_size=8) \
+        .then(add_one_all, process_count=2, batch_size=4, vectorized=True) \
+        .maybe(process_count=1)
+
+    assert sorted(result) == list(range(3, 52))
+
+
+def test_maybe_stream() -> None:
+    stream = MultiprocessMaybe() \
+        .insert(iter(range(1, 101))) \
+        .then(add_one, process_count=2) \
+        .stream(default=0, maxsize=2)
+
+    assert sorted(stream) == list(range(2, 102))
+
+
+def test_maybe_ordered() -> None:
+    result = MultiprocessMaybe() \
+        .insert(range(1, 100)) \
+        .then(add_one, process_count=3) \
+        .maybe(process_count=2, ordered=True)
+
+    assert result == list(range(2, 101))
+
+
+async def add_one_async(x: int) -> int: return x + 1
+
+
+def test_maybe_with_executors() -> None:
+    result = MultiprocessMaybe() \
+        .insert(range(1, 50)) \
+        .then(add_one, executor='thread', concurrency=3) \
+        .then(add_one_async, executor='asyncio', concurrency=10) \
+        .maybe(process_count=1, ordered=True)
+
+    assert result == list(range(3, 52))
+
+
+def test_maybe_with_fused_steps() -> None:
+    maybe = MultiprocessMaybe()
+    result = maybe.insert(range(1, 21)).then(add_one, 2).then(add_one, fuse=True).then(add_one_all, vectorized=True, fuse=True).maybe(add_one)
+
+    assert sorted(result) == [x + 4 for x in range(1, 21)]
@@ -0,0 +1,65 @@
+import os
+
+import pytest
+from src.queue_automator.payloads import SharedPayload, cleanup, release, resolve, share
+
+SHARING = ('qatest', 16)
+
+
+def block_exists(name: str) -> bool:
+    return os.path.exists(os.path.join('/dev/shm', name))
+
+
+def test_small_payloads_are_not_shared() -> None:
+    assert share(b'tiny', SHARING) == b'tiny'
+    assert share('a string with more than 16 characters', SHARING) == 'a string with more than 16 characters'
+    assert share(b'x' * 100, None) == b'x' * 100
+
+
+@pytest.mark.parametrize('payload', [b'x' * 100, bytearray(b'y' * 100)])
+def test_share_and_resolve_bytes(payload: bytes) -> None:
+    handle = share(payload, SHARING)
+    assert isinstance(handle, SharedPayload)
+    assert handle.size == 100
+
+    blocks: list = []
+    resolved = resolve(handle, blocks)
+    assert resolved == payload
+    assert type(resolved) is type(payload)
+
+    release(blocks)
+    assert not blocks
+    assert not block_exists(handle.name)
+
+
+def test_resolve_memoryview_is_a_view() -> None:
+    handle = share(memoryview(b'z' * 64).cast('B', (8, 8)), SHARING)
+    blocks: list = []
+    view = resolve(handle, blocks)
+    assert view.shape == (8, 8)
+    assert view.obj is not None and view.tobytes() == b'z' * 64
+
+    # the view still references the block, it is closed by a later release
+    release(blocks)
+    assert not block_exists(handle.name)
+    view.release()
+    release([])
+
+
+def test_resolve_numpy_array() -> None:
+    numpy = pytest.importorskip('numpy')
+    array = numpy.arange(100, dtype='float64').reshape(10, 10)
+    handle = share(array, SHARING)
+    assert handle.kind == 'ndarray'
+
+    blocks: list = []
+    copy = resolve(handle, blocks, copy=True)
+    release(blocks)
+    assert (copy == array).all()
+
+
+def test_cleanup_unlinks_unreleased_blocks() -> None:
+    handles = [share(b'x' * 100, SHARING) for _ in range(3)]
+    assert all(block_exists(handle.name) for handle in handles)
+    assert cleanup('qatest') == 3
+    assert not any(block_exists(handle.name) for handle in handles)
@@ -0,0 +1,48 @@
+from multiprocessing import Process
+
+import pytest
+from src.queue_automator.stats import LATENCY_BUCKETS, PipelineStats, StageCounters, latency_bucket
+
+
+def add_counts(counters: StageCounters) -> None:
+    for _ in range(100):
+        counters.add(1, 1, 0.5)
+
+
+def test_stage_counters_are_shared() -> None:
+    counters = StageCounters()
+    processes = [Process(target=add_counts, args=(counters,)) for _ in range(2)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    snapshot = counters.snapshot()
+    assert snapshot['items_in'] == 200
+    assert snapshot['items_out'] == 200
+    assert snapshot['busy_time'] == 100.0
+
+
+def test_latency_bucket() -> None:
+    assert latency_bucket(0) == 0
+    assert latency_bucket(0.000003) == 2
+    assert latency_bucket(0.001) == 10
+    assert latency_bucket(10 ** 6) == LATENCY_BUCKETS - 1
+
+
+def test_pipeline_stats_from_snapshots() -> None:
+    fast, slow = StageCounters(), StageCounters()
+    fast.add(10, 10, 0.1, get_time=0.9, latencies=[0.01] * 10)
+    slow.add(10, 10, 0.9, get_time=0.1, put_time=0.1, latencies=[0.09] * 9 + [0.5])
+
+    stats = PipelineStats.from_snapshots(2.0, {'fast': fast.snapshot(), 'slow': slow.snapshot()}, {'fast': 1, 'slow': 2}, {'slow': 7})
+
+    assert stats['fast'].throughput == 5.0
+    assert stats['fast'].idle_ratio == pytest.approx(0.9)
+    assert stats['slow'].workers == 2
+    assert stats['slow'].peak_queue_depth == 7
+    assert stats['fast'].peak_queue_depth == 0
+    assert stats.bottleneck() == stats['slow']
+    assert stats['slow'].latency_percentile(50) == pytest.approx(2 ** 17 / 1e6)
+    assert stats['slow'].latency_percentile(100) == pytest.approx(2 ** 19 / 1e6)
+    assert [stage.name for stage in stats] == ['fast', 'slow']
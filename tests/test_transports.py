@@ -0,0 +1,85 @@
+from multiprocessing import Process
+from queue import Empty, Full
+
+import pytest
+from src.queue_automator.constants import Transports
+from src.queue_automator.transports import PipeTransport, ShmRingQueue, ShmRingTransport, create_transport
+
+
+def test_shm_ring_put_get() -> None:
+    queue = ShmRingQueue(capacity=1024)
+    try:
+        items = [1, 'two', {'three': 3}, None]
+        for item in items:
+            queue.put(item)
+        assert queue.qsize() == len(items)
+        assert [queue.get() for _ in items] == items
+        assert queue.empty()
+    finally:
+        queue.unlink()
+
+
+def test_shm_ring_wraps_around() -> None:
+    queue = ShmRingQueue(capacity=256)
+    try:
+        for item in range(100):
+            queue.put(b'x' * (item % 50))
+            assert queue.get() == b'x' * (item % 50)
+    finally:
+        queue.unlink()
+
+
+def test_shm_ring_bounds() -> None:
+    queue = ShmRingQueue(maxsize=1, capacity=256)
+    try:
+        with pytest.raises(Empty):
+            queue.get_nowait()
+        queue.put('a')
+        with pytest.raises(Full):
+            queue.put_nowait('b')
+        with pytest.raises(ValueError):
+            queue.put(b'x' * 512)
+    finally:
+        queue.unlink()
+
+
+def test_shm_ring_task_done_and_join() -> None:
+    queue = ShmRingQueue(capacity=1024)
+    try:
+        queue.put('a')
+        queue.get()
+        queue.task_done()
+        queue.join()
+        with pytest.raises(ValueError):
+            queue.task_done()
+    finally:
+        queue.unlink()
+
+
+def produce(queue: ShmRingQueue, count: int) -> None:
+    for item in range(count):
+        queue.put(item)
+
+
+def test_shm_ring_across_processes() -> None:
+    queue = ShmRingQueue(capacity=512)
+    try:
+        process = Process(target=produce, args=(queue, 200))
+        process.start()
+        received = [queue.get() for _ in range(200)]
+        process.join()
+        assert received == list(range(200))
+    finally:
+        queue.unlink()
+
+
+@pytest.mark.parametrize('transport,factory_type', ((Transports.PIPE, PipeTransport), (Transports.SHM_RING, ShmRingTransport)))
+def test_create_transport(transport: str, factory_type: type) -> None:
+    factory = create_transport(transport)
+    assert isinstance(factory, factory_type)
+    factory.shutdown()
+
+
+def test_create_invalid_transport() -> None:
+    with pytest.raises(ValueError):
+        create_transport('invalid')